@@ -35,8 +35,9 @@ def get_url():
     user = os.getenv("PG_USER", "postgres")
     password = os.getenv("PG_PASS", "")
     server = os.getenv("PG_HOST", "db")
+    port = os.getenv("PG_PORT", "5432")
     db = os.getenv("PG_DB", "app")
-    return f"postgresql+asyncpg://{user}:{password}@{server}/{db}"
+    return f"postgresql+asyncpg://{user}:{password}@{server}:{port}/{db}"
 
 
 def run_migrations_offline() -> None:
@@ -77,7 +78,6 @@ async def run_async_migrations() -> None:
 
     configuration = config.get_section(config.config_ini_section)
     configuration["sqlalchemy.url"] = get_url()
-    print(get_url())
     connectable = async_engine_from_config(
         configuration,
         prefix="sqlalchemy.",
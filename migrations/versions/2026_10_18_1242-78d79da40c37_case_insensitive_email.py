@@ -0,0 +1,49 @@
+"""case insensitive email
+
+Replaces the unique index on email with one on lower(email). Fails if
+existing emails differ only in case, merge those accounts first.
+
+Revision ID: 78d79da40c37
+Revises: 29cf7e27a5f7
+Create Date: 2026-10-18 12:42:37.826204
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "78d79da40c37"
+down_revision: Union[str, None] = "29cf7e27a5f7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Built without locking writes to users, which needs autocommit
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "users_email_lower_key",
+            "users",
+            [sa.text("lower(email)")],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "users_email_idx", table_name="users", postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "users_email_idx",
+            "users",
+            ["email"],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "users_email_lower_key", table_name="users", postgresql_concurrently=True
+        )
@@ -1,35 +1,141 @@
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Sequence
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src import crud
-from src.api.deps import get_db
+from src import crud, schemas
+from src.api.deps import get_current_user, get_db, reusable_oauth2
 from src.core import security
 from src.core.config import settings
-from src.schemas.token import Token
+from src.core.exceptions import ForbiddenException, TooManyRequestsException
+from src.core.keys import key_set
+from src.core.metrics import registry
+from src.core.rate_limit import SlidingWindowLimiter, rate_limit_backend
+from src.schemas.token import RefreshTokenRequest, Token
 
 router = APIRouter()
 
+LOGIN_ATTEMPTS = registry.counter("login_attempts", "Login attempts", ("result",))
+ip_limiter = SlidingWindowLimiter(
+    rate_limit_backend,
+    name="login-ip",
+    limit=settings.LOGIN_IP_LIMIT,
+    window=settings.LOGIN_IP_WINDOW_SECONDS,
+)
+account_limiter = SlidingWindowLimiter(
+    rate_limit_backend,
+    name="login-account",
+    limit=settings.LOGIN_ACCOUNT_LIMIT,
+    window=settings.LOGIN_ACCOUNT_WINDOW_SECONDS,
+)
+TOKEN_REFRESHES = registry.counter("token_refreshes", "Refresh token uses", ("result",))
 
-@router.post("/login", response_model=Token)
+
+def _token_response(
+    user: Any, scopes: Sequence[str], refresh_token: str
+) -> Dict[str, Any]:
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return {
+        "access_token": security.create_access_token(
+            user.id,
+            expires_delta=access_token_expires,
+            is_superuser=user.is_superuser,
+            scopes=scopes,
+            version=user.token_version,
+        ),
+        "token_type": "bearer",
+        "expires_in": int(access_token_expires.total_seconds()),
+        "refresh_token": refresh_token,
+        "scope": " ".join(scopes),
+    }
+
+
+async def throttle_login(
+    request: Request, form_data: OAuth2PasswordRequestForm = Depends()
+) -> None:
+    """
+    Reject login attempts over the per-IP or per-account limit before any
+    database or password hashing work is done.
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    client = request.client.host if request.client else "unknown"
+    retry_after = max(
+        await ip_limiter.hit(client),
+        await account_limiter.hit(form_data.username.lower()),
+    )
+    if retry_after:
+        LOGIN_ATTEMPTS.labels("throttled").inc()
+        raise TooManyRequestsException(
+            "Too many login attempts, try again later", retry_after=retry_after
+        )
+
+
+@router.post("/login", response_model=Token, dependencies=[Depends(throttle_login)])
 async def login(
     db: AsyncSession = Depends(get_db),
     form_data: OAuth2PasswordRequestForm = Depends(),
 ):
     """
-    OAuth2 compatible token login, get an access token for future requests
+    OAuth2 compatible token login, get an access token for future requests.
+    The token is granted the requested scopes the user may have, or all of
+    them if none were requested.
     """
     user = await crud.user.authenticate(
         db, email=form_data.username, password=form_data.password
     )
     if not user:
+        LOGIN_ATTEMPTS.labels("failure").inc()
         raise HTTPException(status_code=400, detail="Incorrect email or password")
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    return {
-        "access_token": security.create_access_token(
-            user.id, expires_delta=access_token_expires
-        ),
-        "token_type": "bearer",
-    }
+    LOGIN_ATTEMPTS.labels("success").inc()
+    scopes = security.grant_scopes(form_data.scopes, user.is_superuser)
+    if not scopes:
+        raise HTTPException(status_code=400, detail="Invalid scope")
+    refresh_token = await crud.refresh_token.issue(
+        db, user_id=user.id, scope=" ".join(scopes) if form_data.scopes else None
+    )
+    return _token_response(user, scopes, refresh_token)
+
+
+@router.post("/login/refresh", response_model=Token)
+async def refresh(body: RefreshTokenRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Exchange a refresh token for a new access token. Refresh tokens are single
+    use, the response carries the next one. The claims are taken from the
+    user as it is now, within the scopes of the login.
+    """
+    rotated = await crud.refresh_token.rotate(db, token=body.refresh_token)
+    user = None
+    if rotated is not None:
+        user = await crud.user.get_one(db, id_=rotated[1])
+    if user is None:
+        TOKEN_REFRESHES.labels("failure").inc()
+        raise ForbiddenException("Invalid refresh token")
+    TOKEN_REFRESHES.labels("success").inc()
+    refresh_token, _, scope = rotated
+    scopes = security.grant_scopes(scope.split() if scope else (), user.is_superuser)
+    return _token_response(user, scopes, refresh_token)
+
+
+@router.post("/logout", status_code=204)
+async def logout(
+    body: Optional[RefreshTokenRequest] = None,
+    db: AsyncSession = Depends(get_db),
+    token: str = Depends(reusable_oauth2),
+    current_user: schemas.Principal = Depends(get_current_user),
+):
+    """
+    Revoke the current access token and, if given, the refresh token family.
+    """
+    payload = schemas.TokenPayload(**key_set.decode(token))
+    if payload.jti is not None and payload.exp is not None:
+        await crud.revoked_token.revoke(
+            db,
+            jti=payload.jti,
+            expires_at=datetime.fromtimestamp(payload.exp, timezone.utc),
+        )
+    if body is not None:
+        await crud.refresh_token.revoke_family(db, token=body.refresh_token)
+    return Response(status_code=204)
@@ -1,34 +1,60 @@
-from typing import Any, List
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, List, Literal, Optional
+from uuid import UUID
 
-from fastapi import APIRouter, Body, Depends
-from fastapi.encoders import jsonable_encoder
+from fastapi import APIRouter, Body, Depends, Query, Security
 from pydantic import EmailStr
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
-
-from src import crud, models, schemas
-from src.api.deps import get_current_superuser, get_current_user, get_db
-from src.core.exceptions import (DuplicatedEntryError, ForbiddenException,
+from starlette.responses import StreamingResponse
+
+from src import crud, schemas
+from src.api.deps import (get_current_superuser, get_current_user, get_db,
+                          get_read_db)
+from src.api.responses import RawJSONResponse
+from src.core.config import settings
+from src.core.exceptions import (BadRequestException, ForbiddenException,
                                  NotFoundException)
+from src.database.postgres.replicas import ReadSessionFactory, replica_set
 
 router = APIRouter()
 
+EXPORT_COLUMNS = list(schemas.User.model_fields)
+
 
 @router.post("/", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
 async def create_user(
     *,
     db: AsyncSession = Depends(get_db),
     user_in: schemas.UserCreate,
-    current_user: models.User = Depends(get_current_superuser),
+    current_user: schemas.Principal = Depends(get_current_superuser),
 ) -> Any:
     """
     Create new user.
     """
-    user = await crud.user.get_by_email(db, email=user_in.email)
-    if user:
-        raise DuplicatedEntryError("A user with this email already exists")
     user = await crud.user.add(db, obj_in=user_in)
-    return user
+    return RawJSONResponse(
+        schemas.dump_user_json(user), status_code=status.HTTP_201_CREATED
+    )
+
+
+@router.post("/bulk", response_model=List[schemas.UserBulkCreateResult])
+async def create_users_bulk(
+    *,
+    db: AsyncSession = Depends(get_db),
+    users_in: List[schemas.UserCreate],
+    current_user: schemas.Principal = Depends(get_current_superuser),
+) -> Any:
+    """
+    Create many users at once, reporting the outcome of every row.
+    """
+    if len(users_in) > settings.BULK_CREATE_MAX_USERS:
+        raise BadRequestException(
+            f"At most {settings.BULK_CREATE_MAX_USERS} users can be created at once"
+        )
+    return await crud.user.add_many(db, objs_in=users_in)
 
 
 @router.post("/open", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
@@ -42,23 +68,25 @@ async def create_user_open(
     """
     Create new user without the need to be logged in.
     """
-    user = await crud.user.get_by_email(db, email=email)
-    if user:
-        raise DuplicatedEntryError("A user with this email already exists")
     user_in = schemas.UserCreate(password=password, email=email, full_name=full_name)
     user = await crud.user.add(db, obj_in=user_in)
-    return user
+    return RawJSONResponse(
+        schemas.dump_user_json(user), status_code=status.HTTP_201_CREATED
+    )
 
 
 @router.get("/me", response_model=schemas.User)
 async def read_user_me(
-    db: AsyncSession = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
-) -> schemas.User:
+    db: AsyncSession = Depends(get_read_db),
+    current_user: schemas.Principal = Security(get_current_user, scopes=["me"]),
+) -> Any:
     """
     Get current user.
     """
-    return current_user
+    user = await crud.user.get_one(db, id_=current_user.id)
+    if not user:
+        raise NotFoundException(message="User not found")
+    return RawJSONResponse(schemas.dump_user_json(user))
 
 
 @router.put("/me", response_model=schemas.User)
@@ -68,71 +96,147 @@ async def update_user_me(
     password: str = Body(None),
     full_name: str = Body(None),
     email: EmailStr = Body(None),
-    current_user: models.User = Depends(get_current_user),
+    current_user: schemas.Principal = Security(get_current_user, scopes=["me"]),
 ) -> Any:
     """
     Update own user.
     """
-    current_user_data = jsonable_encoder(current_user)
-    user_in: schemas.UserUpdate = schemas.UserUpdate(**current_user_data)
-    if password is not None:
-        user_in.password = password
-    if full_name is not None:
-        user_in.full_name = full_name
-    if email is not None:
-        user_in.email = email
-    user = await crud.user.update(db, current_user.id, user_in)
-    return user
+    # Only the given fields are written, the rest of the row is untouched
+    update_data = {
+        key: value
+        for key, value in (
+            ("password", password),
+            ("full_name", full_name),
+            ("email", email),
+        )
+        if value is not None
+    }
+    user = await crud.user.update(db, current_user.id, update_data)
+    if not user:
+        raise NotFoundException(message="User not found")
+    replica_set.stick(current_user.id)
+    return RawJSONResponse(schemas.dump_user_json(user))
 
 
 @router.get("/", response_model=List[schemas.User])
 async def read_users(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: models.User = Depends(get_current_superuser),
+    cursor: Optional[str] = None,
+    current_user: schemas.Principal = Depends(get_current_superuser),
 ) -> Any:
     """
     Retrieve users.
+
+    Pages are returned with a cursor in the `X-Next-Cursor` header, pass it
+    back as `cursor` to get the next page. `skip` is still supported but gets
+    slower the further it goes.
+    """
+    if skip and cursor is None:
+        users = await crud.user.get_list(db, skip=skip, limit=limit)
+        return RawJSONResponse(schemas.dump_users_json(users))
+    try:
+        users, next_cursor = await crud.user.get_page(db, cursor=cursor, limit=limit)
+    except ValueError:
+        raise BadRequestException("Invalid cursor")
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor is not None else None
+    return RawJSONResponse(schemas.dump_users_json(users), headers=headers)
+
+
+async def _export_rows(fmt: str, filters: dict) -> AsyncIterator[str]:
+    async with ReadSessionFactory() as session:
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            yield buffer.getvalue()
+        batches = crud.user.stream(
+            session,
+            columns=EXPORT_COLUMNS,
+            batch_size=settings.EXPORT_BATCH_SIZE,
+            **filters,
+        )
+        async for rows in batches:
+            if fmt == "csv":
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows([row[c] for c in EXPORT_COLUMNS] for row in rows)
+                yield buffer.getvalue()
+            else:
+                yield "".join(json.dumps(dict(row), default=str) + "\n" for row in rows)
+
+
+@router.get("/export")
+async def export_users(
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    email: Optional[EmailStr] = None,
+    full_name: Optional[str] = None,
+    is_superuser: Optional[bool] = None,
+    current_user: schemas.Principal = Depends(get_current_superuser),
+) -> StreamingResponse:
     """
-    return await crud.user.get_list(db, skip=skip, limit=limit)
+    Stream all users matching the filters as NDJSON or CSV.
+    """
+    filters = {
+        key: value
+        for key, value in (
+            ("email", email),
+            ("full_name", full_name),
+            ("is_superuser", is_superuser),
+        )
+        if value is not None
+    }
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_rows(fmt, filters),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=users.{fmt}"},
+    )
 
 
 @router.get("/{user_id}", response_model=schemas.User)
 async def read_user_by_id(
-    user_id: int,
-    current_user: models.User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    user_id: UUID,
+    current_user: schemas.Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
 ) -> Any:
     """
     Get a specific user by id.
     """
-    user = await crud.user.get(db, id=user_id)
+    # Decided from the token claims, before any user is loaded
+    if user_id == current_user.id:
+        allowed = "me" in current_user.scopes
+    else:
+        allowed = "users" in current_user.scopes and await crud.user.is_superuser(
+            current_user
+        )
+    if not allowed:
+        raise ForbiddenException("The user doesn't have enough privileges")
+    user = await crud.user.get_one(db, id_=user_id)
     if not user:
         raise NotFoundException(
             message="The user with this username does not exist in the system",
         )
-    if user == current_user:
-        return user
-    if not await crud.user.is_superuser(current_user):
-        raise ForbiddenException("The user doesn't have enough privileges")
-    return user
+    return RawJSONResponse(schemas.dump_user_json(user))
 
 
 @router.put("/{user_id}", response_model=schemas.User)
 async def update_user(
     *,
     db: AsyncSession = Depends(get_db),
-    user_id: int,
+    user_id: UUID,
     user_in: schemas.UserUpdate,
-    current_user: models.User = Depends(get_current_superuser),
+    current_user: schemas.Principal = Depends(get_current_superuser),
 ) -> Any:
     """
     Update a user.
     """
-    user = await crud.user.get(db, id=user_id)
+    user = await crud.user.update(db, id_=user_id, obj_in=user_in)
+    replica_set.stick(current_user.id)
+    replica_set.stick(user_id)
     if not user:
         raise NotFoundException(
             message="The user with this username does not exist in the system",
         )
-    return await crud.user.update(db, id_=user.id, obj_in=user_in)
+    return RawJSONResponse(schemas.dump_user_json(user))
@@ -1,15 +1,34 @@
-from fastapi import Depends, HTTPException
-from fastapi.security import OAuth2PasswordBearer
-from jose import jwt
+from fastapi import Depends, Security
+from fastapi.security import OAuth2PasswordBearer, SecurityScopes
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src import crud, models, schemas
+from src import crud, schemas
 from src.core.config import settings
 from src.core.exceptions import ForbiddenException
+from src.core.jwt_codec import JWTError
+from src.core.keys import key_set
+from src.core.metrics import registry
+from src.core.revocation import revocation_list, version_key
+from src.core.security import SCOPES
+from src.core.token_cache import token_cache
 from src.database.postgres.database import AsyncSessionFactory
+from src.database.postgres.replicas import (ReadSessionFactory, reader_id,
+                                            replica_set)
 
 reusable_oauth2 = OAuth2PasswordBearer(
-    tokenUrl=f"{settings.API_V1_STR}/login/access-token"
+    tokenUrl=f"{settings.API_V1_STR}/login/access-token", scopes=SCOPES
+)
+
+JWT_DECODED = registry.counter("jwt_decoded", "Access tokens verified", ("result",))
+registry.callback_counter(
+    "token_cache_lookups",
+    "Verified token cache lookups",
+    lambda: {("hit",): token_cache.hits, ("miss",): token_cache.misses},
+    ("result",),
+)
+registry.gauge("token_cache_size", "Verified tokens cached", lambda: len(token_cache))
+registry.gauge(
+    "revoked_tokens", "Revoked, unexpired access tokens", lambda: len(revocation_list)
 )
 
 
@@ -18,29 +37,58 @@ async def get_db() -> AsyncSession:
         yield session
 
 
+async def get_read_db(db: AsyncSession = Depends(get_db)) -> AsyncSession:
+    """
+    Session for read-only work, on a replica when any are configured. Without
+    replicas it is the request's `get_db` session, which only connects if
+    it is used.
+    """
+    if not replica_set.replicas:
+        yield db
+        return
+    async with ReadSessionFactory() as session:
+        yield session
+
+
 async def get_current_user(
-    db: AsyncSession = Depends(get_db), token: str = Depends(reusable_oauth2)
-) -> models.User:
+    security_scopes: SecurityScopes, token: str = Depends(reusable_oauth2)
+) -> schemas.Principal:
+    """
+    The principal the access token was issued to, authorized from its claims
+    alone. Handlers that need the rest of the user load it themselves.
+    """
     from pydantic import ValidationError
 
-    try:
-        from src.core import security
-
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
+    cached = token_cache.get(token)
+    if cached is not None:
+        token_data, principal = cached.payload, cached.principal
+    else:
+        try:
+            token_data = schemas.TokenPayload(**key_set.decode(token))
+        except (JWTError, ValidationError):
+            token_data = None
+        if token_data is None or token_data.sub is None:
+            JWT_DECODED.labels("invalid").inc()
+            raise ForbiddenException("Could not validate credentials")
+        JWT_DECODED.labels("valid").inc()
+        principal = schemas.Principal(
+            token_data.sub, token_data.su, tuple(token_data.scope.split())
         )
-        token_data = schemas.TokenPayload(**payload)
-    except (jwt.JWTError, ValidationError):
-        raise ForbiddenException("Could not validate credentials")
-    user = crud.user.get_one(db, id_=token_data.sub)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+        token_cache.set(token, token_data, principal, exp=token_data.exp)
+    if (
+        token_data.jti in revocation_list
+        or version_key(token_data.sub, token_data.ver) in revocation_list
+    ):
+        raise ForbiddenException("Token has been revoked")
+    if not all(scope in principal.scopes for scope in security_scopes.scopes):
+        raise ForbiddenException("Not enough permissions")
+    reader_id.set(str(token_data.sub))
+    return principal
 
 
 async def get_current_superuser(
-    current_user: models.User = Depends(get_current_user),
-) -> models.User:
-    if not crud.user.is_superuser(current_user):
+    current_user: schemas.Principal = Security(get_current_user, scopes=["users"]),
+) -> schemas.Principal:
+    if not await crud.user.is_superuser(current_user):
         raise ForbiddenException("The user doesn't have enough privileges")
     return current_user
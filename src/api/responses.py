@@ -0,0 +1,15 @@
+from fastapi.responses import ORJSONResponse, Response
+
+# Default for every route, orjson serializes several times faster than the
+# stdlib encoder
+DefaultResponse = ORJSONResponse
+
+
+class RawJSONResponse(Response):
+    """
+    Body that is already serialized JSON, e.g. from `schemas.dump_users_json`.
+    Returning it skips FastAPI's response model validation and encoding, the
+    route's `response_model` is then only used for the OpenAPI schema.
+    """
+
+    media_type = "application/json"
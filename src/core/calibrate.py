@@ -0,0 +1,86 @@
+"""
+Pick password hashing costs that meet a target latency on this machine.
+
+    python -m src.core.calibrate --target-ms 250
+
+Run it on production hardware and copy the printed settings into the
+environment. Stored hashes are upgraded on the next login of each user.
+"""
+import argparse
+import time
+from typing import Callable, Optional
+
+import bcrypt
+
+from src.core.config import settings
+from src.core.security import Argon2Hasher
+
+PASSWORD = "calibration-password"
+
+
+def measure(func: Callable[[], object], repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def calibrate_bcrypt(target: float, *, max_rounds: int = 20) -> int:
+    """
+    Highest bcrypt cost hashing within `target` seconds, at least 4.
+    """
+    rounds = 4
+    while rounds < max_rounds:
+        salt = bcrypt.gensalt(rounds=rounds + 1)
+        if measure(lambda: bcrypt.hashpw(PASSWORD.encode("utf8"), salt)) > target:
+            break
+        rounds += 1
+    return rounds
+
+
+def calibrate_argon2(
+    target: float, *, memory_cost: int, parallelism: int, max_time_cost: int = 20
+) -> Optional[int]:
+    """
+    Highest argon2id time cost hashing within `target` seconds with the given
+    memory and parallelism, or `None` if even one pass is too slow.
+    """
+    time_cost = 0
+    while time_cost < max_time_cost:
+        hasher = Argon2Hasher(
+            time_cost=time_cost + 1, memory_cost=memory_cost, parallelism=parallelism
+        )
+        if measure(lambda: hasher.hash(PASSWORD)) > target:
+            break
+        time_cost += 1
+    return time_cost or None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target-ms", type=float, default=250)
+    parser.add_argument(
+        "--argon2-memory-cost", type=int, default=settings.ARGON2_MEMORY_COST
+    )
+    parser.add_argument(
+        "--argon2-parallelism", type=int, default=settings.ARGON2_PARALLELISM
+    )
+    args = parser.parse_args()
+    target = args.target_ms / 1000
+
+    print(f"BCRYPT_ROUNDS={calibrate_bcrypt(target)}")
+    time_cost = calibrate_argon2(
+        target, memory_cost=args.argon2_memory_cost, parallelism=args.argon2_parallelism
+    )
+    if time_cost is None:
+        print("# argon2id exceeds the target with this memory cost, lower it")
+        return
+    print(f"ARGON2_TIME_COST={time_cost}")
+    print(f"ARGON2_MEMORY_COST={args.argon2_memory_cost}")
+    print(f"ARGON2_PARALLELISM={args.argon2_parallelism}")
+
+
+if __name__ == "__main__":
+    main()
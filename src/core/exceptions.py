@@ -1,7 +1,14 @@
+import math
+
 from fastapi import HTTPException
 from starlette import status
 
 
+class BadRequestException(HTTPException):
+    def __init__(self, message):
+        super().__init__(status_code=status.HTTP_400_BAD_REQUEST, detail=message)
+
+
 class DuplicatedEntryError(HTTPException):
     def __init__(self, message: str):
         super().__init__(status_code=status.HTTP_409_CONFLICT, detail=message)
@@ -15,3 +22,21 @@ class ForbiddenException(HTTPException):
 class NotFoundException(HTTPException):
     def __init__(self, message):
         super().__init__(status_code=status.HTTP_404_NOT_FOUND, detail=message)
+
+
+class ServiceUnavailableException(HTTPException):
+    def __init__(self, message):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=message,
+            headers={"Retry-After": "1"},
+        )
+
+
+class TooManyRequestsException(HTTPException):
+    def __init__(self, message, retry_after: float):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=message,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
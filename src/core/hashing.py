@@ -0,0 +1,157 @@
+import asyncio
+import contextlib
+import secrets
+import time
+from concurrent.futures import (Executor, ProcessPoolExecutor,
+                                ThreadPoolExecutor)
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple
+
+from src.core.config import settings
+from src.core.exceptions import ServiceUnavailableException
+from src.core.metrics import registry
+from src.core.security import (get_password_hash, password_needs_rehash,
+                               verify_password)
+
+PASSWORD_HASH_SECONDS = registry.histogram(
+    "password_hash_seconds",
+    "Time spent hashing per operation, excluding queueing",
+    ("operation",),
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0),
+)
+PASSWORD_HASH_REJECTED = registry.counter(
+    "password_hash_rejected", "Password operations rejected because the queue is full"
+)
+
+
+def _timed(func: Callable[..., Any], *args: Any) -> Tuple[Any, float]:
+    # Runs in the worker, the timing is recorded back on the event loop
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+class PasswordHasher:
+    def __init__(self, *, workers: int, max_pending: int, executor: str = "thread"):
+        """
+        Runs bcrypt hashing and verification on a bounded worker pool so the
+        event loop is never blocked by a password operation.
+
+        **Parameters**
+
+        * `workers`: Size of the worker pool
+        * `max_pending`: Maximum number of queued and running operations, further
+          calls are rejected with a 503 instead of piling up
+        * `executor`: `thread` (bcrypt releases the GIL) or `process`
+        """
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor_type = executor
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._dummy_hash: Optional[str] = None
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hasher"
+                )
+        return self._executor
+
+    @contextlib.contextmanager
+    def _slot(self) -> Iterator[None]:
+        if self._pending >= self.max_pending:
+            PASSWORD_HASH_REJECTED.inc()
+            raise ServiceUnavailableException(
+                "Too many concurrent password operations, try again later"
+            )
+        self._pending += 1
+        try:
+            yield
+        finally:
+            self._pending -= 1
+
+    async def _run(self, operation: str, func: Callable[..., Any], *args: Any) -> Any:
+        with self._slot():
+            loop = asyncio.get_running_loop()
+            result, elapsed = await loop.run_in_executor(
+                self._get_executor(), _timed, func, *args
+            )
+            PASSWORD_HASH_SECONDS.labels(operation).observe(elapsed)
+            return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(
+            "verify", verify_password, plain_password, hashed_password
+        )
+
+    async def verify_dummy(self, plain_password: str) -> bool:
+        """
+        Verify against a throwaway hash made under the current policy, so a
+        login for an unknown email costs as much as one with a wrong password.
+        """
+        await self.warm_up()
+        await self.verify(plain_password, self._dummy_hash)
+        return False
+
+    async def warm_up(self) -> None:
+        """
+        Start the workers and make the dummy hash ahead of the first login.
+        """
+        if self._dummy_hash is None:
+            self._dummy_hash = await self.hash(secrets.token_urlsafe(16))
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        # Only parses the stored hash, cheap enough for the event loop
+        return password_needs_rehash(hashed_password)
+
+    async def hash_many(self, passwords: Sequence[str]) -> List[str]:
+        """
+        Hash many passwords using every worker, as a single queue slot.
+        Work is submitted one worker-sized chunk at a time so interactive
+        logins wait for at most one chunk instead of the whole batch.
+        """
+        with self._slot():
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            hashed: List[str] = []
+            histogram = PASSWORD_HASH_SECONDS.labels("hash")
+            for start in range(0, len(passwords), self.workers):
+                chunk = passwords[start : start + self.workers]
+                results = await asyncio.gather(
+                    *(
+                        loop.run_in_executor(executor, _timed, get_password_hash, p)
+                        for p in chunk
+                    )
+                )
+                for hashed_password, elapsed in results:
+                    histogram.observe(elapsed)
+                    hashed.append(hashed_password)
+            return hashed
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    executor=settings.PASSWORD_HASH_EXECUTOR,
+)
+
+registry.gauge(
+    "password_hash_pending",
+    "Password operations queued or running",
+    lambda: hasher.pending,
+)
@@ -0,0 +1,132 @@
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.core.config import settings
+from src.core.metrics import COUNT_BUCKETS, registry
+
+logger = logging.getLogger(__name__)
+
+
+class RequestStats:
+    __slots__ = ("statements", "db_seconds", "pool_wait_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+
+
+current_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "current_stats", default=None
+)
+
+
+REQUESTS = registry.counter(
+    "http_requests", "HTTP requests", ("method", "route", "status")
+)
+REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")
+)
+REQUEST_DB_TIME = registry.histogram(
+    "http_request_db_seconds", "Time spent in SQL per request", ("method", "route")
+)
+REQUEST_DB_STATEMENTS = registry.histogram(
+    "http_request_db_statements",
+    "SQL statements per request",
+    ("method", "route"),
+    buckets=COUNT_BUCKETS,
+)
+
+
+def record_pool_wait(seconds: float) -> None:
+    stats = current_stats.get()
+    if stats is not None:
+        stats.pool_wait_seconds += seconds
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_start
+    stats = current_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+    if elapsed * 1000 >= settings.DB_SLOW_QUERY_MS:
+        logger.warning(f"Slow query ({elapsed * 1000:.1f}ms): {statement}")
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """
+    Pure ASGI middleware collecting statement count, DB time and pool wait of
+    every HTTP request. Adds a `Server-Timing` header and aggregates
+    histograms per route in the metrics registry.
+    """
+
+    def __init__(self, app: Callable, server_timing: bool = True):
+        self.app = app
+        self.server_timing = server_timing
+        self._route_names: Dict[Any, str] = {}
+
+    def _route_name(self, scope: Dict[str, Any]) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        name = self._route_names.get(endpoint)
+        if name is None:
+            name = endpoint.__name__
+            for route in scope["app"].router.routes:
+                if getattr(route, "endpoint", None) is endpoint:
+                    name = route.path
+                    break
+            self._route_names[endpoint] = name
+        return name
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            if message["type"] == "http.response.start" and self.server_timing:
+                elapsed = time.perf_counter() - start
+                header = (
+                    f"db;dur={stats.db_seconds * 1000:.1f};"
+                    f'desc="{stats.statements} queries", '
+                    f"pool;dur={stats.pool_wait_seconds * 1000:.1f}, "
+                    f"app;dur={elapsed * 1000:.1f}"
+                )
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", header.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_stats.reset(token)
+            labels = (scope["method"], self._route_name(scope))
+            REQUESTS.labels(*labels, str(status_code)).inc()
+            REQUEST_DURATION.labels(*labels).observe(time.perf_counter() - start)
+            REQUEST_DB_TIME.labels(*labels).observe(stats.db_seconds)
+            REQUEST_DB_STATEMENTS.labels(*labels).observe(stats.statements)
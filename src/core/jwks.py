@@ -0,0 +1,111 @@
+"""
+Verify access tokens locally against the published JWKS.
+
+Meant for services consuming tokens issued here::
+
+    verifier = JWKSVerifier("https://auth.example.com/.well-known/jwks.json")
+    claims = await verifier.verify(token)
+
+Keys are parsed once and cached by `kid`. An unknown `kid` triggers at most
+one refetch per `min_refresh_interval`, which picks up rotated keys without
+letting forged tokens hammer the auth service. A failed fetch keeps the
+cached keys, so tokens keep verifying while the auth service is down.
+"""
+import asyncio
+import json
+import logging
+import time
+import urllib.request
+from typing import Any, Dict, Optional
+
+from src.core.jwt_codec import JWTCodec
+from src.core.keys import JWTKey
+
+logger = logging.getLogger(__name__)
+
+
+class JWKSVerifier:
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        *,
+        jwks: Optional[Dict[str, Any]] = None,
+        ttl: int = 300,
+        min_refresh_interval: int = 30,
+        timeout: float = 5,
+        issuer: Optional[str] = None,
+        audience: Optional[str] = None,
+    ):
+        """
+        **Parameters**
+
+        * `url`: Address of the JWKS document
+        * `jwks`: Initial JWKS document, e.g. bundled with the service
+        * `ttl`: Seconds keys are used before the document is fetched again
+        * `min_refresh_interval`: Minimum seconds between two fetches,
+          successful or not
+        * `timeout`: Fetch timeout in seconds
+        * `issuer`, `audience`: Required `iss` and `aud` claims
+        """
+        self.url = url
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self.codec = JWTCodec(issuer=issuer, audience=audience)
+        self._keys: Dict[str, JWTKey] = {}
+        self._fetched_at = float("-inf")
+        self._attempted_at = float("-inf")
+        self._lock = asyncio.Lock()
+        if jwks is not None:
+            self.load(jwks)
+            self._fetched_at = self._attempted_at = time.monotonic()
+
+    def load(self, jwks: Dict[str, Any]) -> None:
+        if not isinstance(jwks, dict):
+            raise ValueError("JWKS document is not an object")
+        keys = {}
+        for data in jwks.get("keys", []):
+            try:
+                key = JWTKey.from_jwk(data)
+            except (KeyError, ValueError):
+                continue
+            if data.get("alg", key.algorithm) == key.algorithm:
+                keys[data.get("kid", key.kid)] = key
+        self._keys = keys
+
+    def _fetch(self) -> Dict[str, Any]:
+        with urllib.request.urlopen(self.url, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    async def refresh(self, force: bool = False) -> None:
+        """
+        Fetch the JWKS once `ttl` passed, or with `force` right away, but at
+        most once per `min_refresh_interval`. Failures are logged and the
+        cached keys kept.
+        """
+        async with self._lock:
+            now = time.monotonic()
+            if self.url is None or now - self._attempted_at < self.min_refresh_interval:
+                return
+            if not force and now - self._fetched_at < self.ttl:
+                return
+            self._attempted_at = now
+            try:
+                jwks = await asyncio.get_running_loop().run_in_executor(
+                    None, self._fetch
+                )
+                self.load(jwks)
+            except Exception as e:
+                logger.warning(f"Fetching {self.url} failed, keeping cached keys: {e}")
+                return
+            self._fetched_at = now
+
+    async def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Verify `token` and return its claims. Raises `JWTError`.
+        """
+        await self.refresh()
+        kid = self.codec.get_unverified_header(token).get("kid")
+        if kid not in self._keys:
+            await self.refresh(force=True)
+        return self.codec.decode(token, self._keys.get)
@@ -0,0 +1,189 @@
+"""
+JSON Web Token codec.
+
+A small replacement for python-jose limited to what this service issues:
+compact JWS with HS256, RS256, ES256 or EdDSA. Keys are pre-built objects
+(`src.core.keys`), encoded headers are cached per key, and JSON goes through
+orjson.
+
+    python -m tests.benchmarks.bench_jwt
+"""
+import base64
+import binascii
+import calendar
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Protocol, Tuple, Union
+
+import orjson
+
+from src.core.config import settings
+
+
+def b64url_encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def b64url_decode(data: Union[str, bytes]) -> bytes:
+    if isinstance(data, str):
+        data = data.encode("ascii")
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+class JWTError(Exception):
+    pass
+
+
+class ExpiredSignatureError(JWTError):
+    pass
+
+
+class JWTClaimsError(JWTError):
+    pass
+
+
+class Key(Protocol):
+    kid: Optional[str]
+    algorithm: str
+
+    def sign(self, message: bytes) -> bytes:
+        ...
+
+    def verify(self, signature: bytes, message: bytes) -> bool:
+        ...
+
+
+def _numeric_date(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return calendar.timegm(value.utctimetuple())
+    return value
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class JWTCodec:
+    def __init__(
+        self,
+        *,
+        issuer: Optional[str] = None,
+        audience: Optional[str] = None,
+        leeway: float = 0,
+    ):
+        """
+        **Parameters**
+
+        * `issuer`: Added as `iss` to new tokens and required when decoding
+        * `audience`: Added as `aud` to new tokens and required when decoding
+        * `leeway`: Seconds of clock skew tolerated for `exp`, `nbf` and `iat`
+        """
+        self.issuer = issuer
+        self.audience = audience
+        self.leeway = leeway
+        self._encoded_headers: Dict[Tuple[str, Optional[str]], bytes] = {}
+        # Headers issued by this codec, so decoding them is a dict lookup
+        self._decoded_headers: Dict[bytes, Dict[str, Any]] = {}
+
+    def _header(self, key: Key) -> bytes:
+        segment = self._encoded_headers.get((key.algorithm, key.kid))
+        if segment is None:
+            header = {"alg": key.algorithm, "typ": "JWT"}
+            if key.kid is not None:
+                header["kid"] = key.kid
+            segment = b64url_encode(orjson.dumps(header))
+            self._encoded_headers[(key.algorithm, key.kid)] = segment
+            self._decoded_headers[segment] = header
+        return segment
+
+    def encode(self, claims: Dict[str, Any], key: Key) -> str:
+        payload = {name: _numeric_date(value) for name, value in claims.items()}
+        payload.setdefault("iat", int(time.time()))
+        if self.issuer is not None:
+            payload.setdefault("iss", self.issuer)
+        if self.audience is not None:
+            payload.setdefault("aud", self.audience)
+        signing_input = self._header(key) + b"." + b64url_encode(orjson.dumps(payload))
+        signature = b64url_encode(key.sign(signing_input))
+        return (signing_input + b"." + signature).decode("ascii")
+
+    def get_unverified_header(self, token: Union[str, bytes]) -> Dict[str, Any]:
+        return dict(self._split(token)[0])
+
+    def _split(
+        self, token: Union[str, bytes]
+    ) -> Tuple[Dict[str, Any], bytes, bytes, bytes]:
+        try:
+            if isinstance(token, str):
+                token = token.encode("ascii")
+            signing_input, _, signature = token.rpartition(b".")
+            header_segment, _, payload_segment = signing_input.partition(b".")
+            if not header_segment or not payload_segment or b"." in payload_segment:
+                raise JWTError("Malformed token")
+            header = self._decoded_headers.get(header_segment)
+            if header is None:
+                header = orjson.loads(b64url_decode(header_segment))
+                if not isinstance(header, dict) or not all(
+                    isinstance(header.get(name), (str, type(None)))
+                    for name in ("kid", "alg")
+                ):
+                    raise JWTError("Malformed token header")
+            return header, signing_input, payload_segment, b64url_decode(signature)
+        except (ValueError, TypeError, binascii.Error) as e:
+            raise JWTError("Malformed token") from e
+
+    def decode(
+        self,
+        token: Union[str, bytes],
+        get_key: Callable[[Optional[str]], Optional[Key]],
+    ) -> Dict[str, Any]:
+        """
+        Verify the signature and registered claims of `token` and return its
+        claims. `get_key` maps the `kid` header to a key, the token's `alg`
+        must match that key so a public key can never be used as an HMAC
+        secret. Raises `JWTError`.
+        """
+        header, signing_input, payload_segment, signature = self._split(token)
+        key = get_key(header.get("kid"))
+        if key is None:
+            raise JWTError("Unknown signing key")
+        if header.get("alg") != key.algorithm:
+            raise JWTError("The specified alg value is not allowed")
+        if not key.verify(signature, signing_input):
+            raise JWTError("Signature verification failed")
+        try:
+            claims = orjson.loads(b64url_decode(payload_segment))
+        except (ValueError, TypeError, binascii.Error) as e:
+            raise JWTError("Malformed token payload") from e
+        if not isinstance(claims, dict):
+            raise JWTError("Malformed token payload")
+        self.validate(claims)
+        return claims
+
+    def validate(self, claims: Dict[str, Any]) -> None:
+        now = time.time()
+        exp = claims.get("exp")
+        if not _is_number(exp):
+            raise JWTClaimsError("Missing or invalid exp claim")
+        if exp <= now - self.leeway:
+            raise ExpiredSignatureError("Signature has expired")
+        nbf = claims.get("nbf")
+        if nbf is not None and (not _is_number(nbf) or nbf > now + self.leeway):
+            raise JWTClaimsError("The token is not yet valid (nbf)")
+        iat = claims.get("iat")
+        if iat is not None and (not _is_number(iat) or iat > now + self.leeway):
+            raise JWTClaimsError("Invalid iat claim")
+        if self.issuer is not None and claims.get("iss") != self.issuer:
+            raise JWTClaimsError("Invalid issuer")
+        if self.audience is not None:
+            aud = claims.get("aud")
+            audiences = aud if isinstance(aud, list) else [aud]
+            if self.audience not in audiences:
+                raise JWTClaimsError("Invalid audience")
+
+
+codec = JWTCodec(
+    issuer=settings.JWT_ISSUER,
+    audience=settings.JWT_AUDIENCE,
+    leeway=settings.JWT_LEEWAY_SECONDS,
+)
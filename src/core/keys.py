@@ -0,0 +1,262 @@
+"""
+JWT signing keys.
+
+With an asymmetric `JWT_ALGORITHM` tokens are signed with the private key in
+`JWT_PRIVATE_KEY_FILE` and carry its key id (`kid`, the RFC 7638 thumbprint).
+Public keys are published at `/.well-known/jwks.json` so other services can
+verify tokens without calling this one.
+
+Rotating keys:
+
+1. Add the new key to `JWT_PUBLIC_KEY_FILES` and wait `JWKS_MAX_AGE_SECONDS`
+   so every verifier has it cached.
+2. Make it `JWT_PRIVATE_KEY_FILE` and move the old key to
+   `JWT_PUBLIC_KEY_FILES`.
+3. Remove the old key once `ACCESS_TOKEN_EXPIRE_MINUTES` have passed.
+"""
+import hashlib
+import hmac
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, padding, rsa
+from cryptography.hazmat.primitives.asymmetric.utils import (
+    decode_dss_signature, encode_dss_signature)
+
+from src.core.config import settings
+from src.core.jwt_codec import b64url_decode, b64url_encode, codec
+
+# Members used for the RFC 7638 thumbprint of each key type
+_THUMBPRINT_MEMBERS = {
+    "RSA": ("e", "kty", "n"),
+    "EC": ("crv", "kty", "x", "y"),
+    "OKP": ("crv", "kty", "x"),
+}
+
+
+def _int_to_b64(value: int, length: Optional[int] = None) -> str:
+    length = length or (value.bit_length() + 7) // 8
+    return b64url_encode(value.to_bytes(length, "big")).decode("ascii")
+
+
+def _b64_to_int(value: str) -> int:
+    return int.from_bytes(b64url_decode(value), "big")
+
+
+def jwk_thumbprint(public_jwk: Dict[str, Any]) -> str:
+    members = _THUMBPRINT_MEMBERS[public_jwk["kty"]]
+    canonical = json.dumps(
+        {name: public_jwk[name] for name in members},
+        separators=(",", ":"),
+        sort_keys=True,
+    )
+    digest = hashlib.sha256(canonical.encode("utf8")).digest()
+    return b64url_encode(digest).decode("ascii")
+
+
+class HMACKey:
+    __slots__ = ("kid", "algorithm", "secret")
+
+    def __init__(self, secret: Union[str, bytes]):
+        self.kid: Optional[str] = None
+        self.algorithm = "HS256"
+        self.secret = secret.encode("utf8") if isinstance(secret, str) else secret
+
+    def sign(self, message: bytes) -> bytes:
+        return hmac.new(self.secret, message, hashlib.sha256).digest()
+
+    def verify(self, signature: bytes, message: bytes) -> bool:
+        return hmac.compare_digest(signature, self.sign(message))
+
+
+class JWTKey:
+    __slots__ = ("kid", "algorithm", "private_key", "public_key", "public_jwk")
+
+    def __init__(self, key: Any):
+        """
+        Wrap an RSA (RS256), P-256 (ES256) or Ed25519 (EdDSA) key loaded with
+        `cryptography`. Signing and verification use the loaded key objects,
+        nothing is re-parsed per token.
+        """
+        if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+            self.algorithm = "RS256"
+        elif isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)):
+            if not isinstance(key.curve, ec.SECP256R1):
+                raise ValueError(f"Unsupported curve {key.curve.name}")
+            self.algorithm = "ES256"
+        elif isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+            self.algorithm = "EdDSA"
+        else:
+            raise ValueError(f"Unsupported key type {type(key).__name__}")
+        if hasattr(key, "public_key"):
+            self.private_key = key
+            self.public_key = key.public_key()
+        else:
+            self.private_key = None
+            self.public_key = key
+        self.public_jwk = self._public_jwk()
+        self.kid = jwk_thumbprint(self.public_jwk)
+        self.public_jwk.update(kid=self.kid, use="sig", alg=self.algorithm)
+
+    @property
+    def can_sign(self) -> bool:
+        return self.private_key is not None
+
+    @classmethod
+    def from_pem(cls, pem: Union[str, bytes]) -> "JWTKey":
+        if isinstance(pem, str):
+            pem = pem.encode("utf8")
+        try:
+            return cls(serialization.load_pem_private_key(pem, password=None))
+        except ValueError:
+            return cls(serialization.load_pem_public_key(pem))
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "JWTKey":
+        return cls.from_pem(Path(path).read_bytes())
+
+    @classmethod
+    def from_jwk(cls, data: Dict[str, Any]) -> "JWTKey":
+        kty = data.get("kty")
+        if kty == "RSA":
+            e, n = _b64_to_int(data["e"]), _b64_to_int(data["n"])
+            return cls(rsa.RSAPublicNumbers(e, n).public_key())
+        if kty == "EC" and data.get("crv") == "P-256":
+            x, y = _b64_to_int(data["x"]), _b64_to_int(data["y"])
+            return cls(ec.EllipticCurvePublicNumbers(x, y, ec.SECP256R1()).public_key())
+        if kty == "OKP" and data.get("crv") == "Ed25519":
+            raw = b64url_decode(data["x"])
+            return cls(ed25519.Ed25519PublicKey.from_public_bytes(raw))
+        raise ValueError(f"Unsupported JWK {kty} {data.get('crv', '')}")
+
+    def _public_jwk(self) -> Dict[str, Any]:
+        if self.algorithm == "RS256":
+            numbers = self.public_key.public_numbers()
+            return {
+                "kty": "RSA",
+                "n": _int_to_b64(numbers.n),
+                "e": _int_to_b64(numbers.e),
+            }
+        if self.algorithm == "ES256":
+            numbers = self.public_key.public_numbers()
+            return {
+                "kty": "EC",
+                "crv": "P-256",
+                "x": _int_to_b64(numbers.x, 32),
+                "y": _int_to_b64(numbers.y, 32),
+            }
+        raw = self.public_key.public_bytes(
+            serialization.Encoding.Raw, serialization.PublicFormat.Raw
+        )
+        return {"kty": "OKP", "crv": "Ed25519", "x": b64url_encode(raw).decode("ascii")}
+
+    def sign(self, message: bytes) -> bytes:
+        if self.algorithm == "RS256":
+            return self.private_key.sign(message, padding.PKCS1v15(), hashes.SHA256())
+        if self.algorithm == "ES256":
+            # JWS uses the fixed size r || s encoding instead of DER
+            r, s = decode_dss_signature(
+                self.private_key.sign(message, ec.ECDSA(hashes.SHA256()))
+            )
+            return r.to_bytes(32, "big") + s.to_bytes(32, "big")
+        return self.private_key.sign(message)
+
+    def verify(self, signature: bytes, message: bytes) -> bool:
+        try:
+            if self.algorithm == "RS256":
+                self.public_key.verify(
+                    signature, message, padding.PKCS1v15(), hashes.SHA256()
+                )
+            elif self.algorithm == "ES256":
+                if len(signature) != 64:
+                    return False
+                der = encode_dss_signature(
+                    int.from_bytes(signature[:32], "big"),
+                    int.from_bytes(signature[32:], "big"),
+                )
+                self.public_key.verify(der, message, ec.ECDSA(hashes.SHA256()))
+            else:
+                self.public_key.verify(signature, message)
+        except InvalidSignature:
+            return False
+        return True
+
+
+SigningKey = Union[HMACKey, JWTKey]
+
+
+class KeySet:
+    def __init__(
+        self,
+        algorithm: str,
+        *,
+        secret: Optional[str] = None,
+        signing_key: Optional[JWTKey] = None,
+        verification_keys: Optional[List[JWTKey]] = None,
+    ):
+        """
+        Keys used to sign and verify access tokens.
+
+        **Parameters**
+
+        * `algorithm`: `HS256` (shared `secret`), `RS256`, `ES256` or `EdDSA`
+        * `signing_key`: Private key used for new tokens
+        * `verification_keys`: Previous or upcoming keys that are published
+          and still accepted
+        """
+        self.algorithm = algorithm
+        self._keys: Dict[Optional[str], SigningKey] = {}
+        if algorithm == "HS256":
+            self.signing_key: SigningKey = HMACKey(secret)
+            self._keys[None] = self.signing_key
+        else:
+            if signing_key is None or not signing_key.can_sign:
+                raise ValueError(f"{algorithm} requires a private signing key")
+            if signing_key.algorithm != algorithm:
+                raise ValueError(
+                    f"Signing key is a {signing_key.algorithm} key, not {algorithm}"
+                )
+            self.signing_key = signing_key
+            for key in [signing_key, *(verification_keys or [])]:
+                self._keys[key.kid] = key
+        self._jwks = {
+            "keys": [key.public_jwk for key in self._keys.values() if key.kid]
+        }
+        # Serialized once, the document only changes on restart
+        self.jwks_body = json.dumps(self._jwks, separators=(",", ":")).encode("utf8")
+        self.jwks_etag = f'"{hashlib.sha256(self.jwks_body).hexdigest()[:32]}"'
+
+    def get(self, kid: Optional[str]) -> Optional[SigningKey]:
+        return self._keys.get(kid)
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        return codec.encode(claims, self.signing_key)
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        """
+        Verify `token` and return its claims. Raises `JWTError`.
+        """
+        return codec.decode(token, self.get)
+
+    def jwks(self) -> Dict[str, List[Dict[str, Any]]]:
+        return self._jwks
+
+
+def load_key_set() -> KeySet:
+    if settings.JWT_ALGORITHM == "HS256":
+        return KeySet("HS256", secret=settings.SECRET_KEY)
+    if not settings.JWT_PRIVATE_KEY_FILE:
+        raise ValueError(
+            f"JWT_PRIVATE_KEY_FILE is required for {settings.JWT_ALGORITHM}"
+        )
+    return KeySet(
+        settings.JWT_ALGORITHM,
+        signing_key=JWTKey.from_file(settings.JWT_PRIVATE_KEY_FILE),
+        verification_keys=[JWTKey.from_file(p) for p in settings.JWT_PUBLIC_KEY_FILES],
+    )
+
+
+key_set = load_key_set()
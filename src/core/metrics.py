@@ -0,0 +1,233 @@
+"""
+Minimal Prometheus-compatible metrics registry.
+
+Metrics are updated from the event loop thread only (worker threads hand
+their timings back to the loop), so plain attribute updates are safe and no
+locks are taken on the hot path.
+"""
+from bisect import bisect_left
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple, Union
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], **extra) -> str:
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram. Buckets are upper bounds, an implicit `+Inf`
+    bucket catches everything above the last one.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets: Tuple[float, ...] = tuple(buckets)
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        result, total = [], 0
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else str(bound), total))
+        return result
+
+    def snapshot(self) -> Dict[str, object]:
+        return {"count": self.count, "sum": self.sum, "buckets": self.cumulative()}
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type_name}"
+
+    def collect(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._children: Dict[LabelValues, _CounterChild] = {}
+        if not self.labelnames:
+            self._children[()] = _CounterChild()
+
+    def labels(self, *values: str) -> _CounterChild:
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = _CounterChild()
+        return child
+
+    def inc(self, amount: float = 1) -> None:
+        self._children[()].inc(amount)
+
+    @property
+    def value(self) -> float:
+        return self._children[()].value
+
+    def collect(self) -> Iterator[str]:
+        yield from self.header()
+        for values, child in self._children.items():
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_total{labels} {_format_value(child.value)}"
+
+
+GaugeValue = Union[float, Dict[LabelValues, float]]
+
+
+class Gauge(_Metric):
+    """
+    Gauge read from `callback` at scrape time. The callback returns a number,
+    or a dict of label values to numbers for labelled gauges.
+    """
+
+    type_name = "gauge"
+    suffix = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], GaugeValue],
+        labelnames: Sequence[str] = (),
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def collect(self) -> Iterator[str]:
+        yield from self.header()
+        value = self.callback()
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        for values, number in items:
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}{self.suffix}{labels} {_format_value(number)}"
+
+
+class CallbackCounter(Gauge):
+    """
+    Counter read from `callback` at scrape time, for totals that are already
+    kept elsewhere (cache hit counts, pool checkouts, ...).
+    """
+
+    type_name = "counter"
+    suffix = "_total"
+
+
+class HistogramFamily(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._children: Dict[LabelValues, Histogram] = {}
+        if not self.labelnames:
+            self._children[()] = Histogram(self.buckets)
+
+    def labels(self, *values: str) -> Histogram:
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = Histogram(self.buckets)
+        return child
+
+    def observe(self, value: float) -> None:
+        self._children[()].observe(value)
+
+    def collect(self) -> Iterator[str]:
+        yield from self.header()
+        for values, child in self._children.items():
+            for bound, count in child.cumulative():
+                labels = _format_labels(self.labelnames, values, le=bound)
+                yield f"{self.name}_bucket{labels} {count}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {child.count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, callback, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, callback, labelnames))
+
+    def callback_counter(
+        self, name: str, documentation: str, callback, labelnames=()
+    ) -> CallbackCounter:
+        return self.register(CallbackCounter(name, documentation, callback, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS
+    ) -> HistogramFamily:
+        return self.register(HistogramFamily(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
@@ -0,0 +1,120 @@
+import abc
+import logging
+import time
+from collections import OrderedDict
+from typing import List, Tuple
+
+from src.core.config import settings
+from src.crud.cache import RedisCacheBackend
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitBackend(abc.ABC):
+    @abc.abstractmethod
+    async def incr(self, key: str, window: int, ttl: int) -> Tuple[int, int]:
+        """
+        Count a hit for `key` in fixed window number `window` and return the
+        counts of the current and the previous window.
+        """
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    def __init__(self, maxsize: int = 100_000):
+        """
+        Process local counters. Each key holds three integers, the least
+        recently used keys are dropped past `maxsize`.
+        """
+        self.maxsize = maxsize
+        self._counters: "OrderedDict[str, List[int]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    async def incr(self, key: str, window: int, ttl: int) -> Tuple[int, int]:
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters[key] = [window, 0, 0]
+            while len(self._counters) > self.maxsize:
+                self._counters.popitem(last=False)
+        else:
+            self._counters.move_to_end(key)
+        current_window, previous, current = counter
+        if window == current_window + 1:
+            previous, current = current, 0
+        elif window != current_window:
+            previous, current = 0, 0
+        current += 1
+        counter[:] = [window, previous, current]
+        return current, previous
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    def __init__(self, redis: RedisCacheBackend):
+        """
+        Counters shared by every worker, one round trip per hit.
+        """
+        self.redis = redis
+
+    async def incr(self, key: str, window: int, ttl: int) -> Tuple[int, int]:
+        current, _, previous = await self.redis.pipeline(
+            ("INCR", f"{key}:{window}"),
+            ("EXPIRE", f"{key}:{window}", ttl),
+            ("GET", f"{key}:{window - 1}"),
+        )
+        return current, int(previous or 0)
+
+
+class SlidingWindowLimiter:
+    def __init__(
+        self, backend: RateLimitBackend, *, name: str, limit: int, window: int
+    ):
+        """
+        Sliding window counter: the previous fixed window is weighted by how
+        much of it still overlaps the sliding window, so limits hold at window
+        boundaries without storing a timestamp per hit.
+
+        **Parameters**
+
+        * `backend`: Counter storage
+        * `name`: Key prefix
+        * `limit`: Hits allowed per sliding window
+        * `window`: Window length in seconds
+        """
+        self.backend = backend
+        self.name = name
+        self.limit = limit
+        self.window = window
+
+    async def hit(self, key: str) -> float:
+        """
+        Count a hit and return 0 if it is allowed, otherwise the number of
+        seconds until it would be. Backend errors fail open.
+        """
+        now = time.time()
+        window, offset = divmod(now, self.window)
+        try:
+            current, previous = await self.backend.incr(
+                f"ratelimit:{self.name}:{key}", int(window), self.window * 2
+            )
+        except Exception as e:
+            logger.warning(f"Rate limit backend failed for {self.name}: {e}")
+            return 0
+        weight = 1 - offset / self.window
+        if previous * weight + current <= self.limit:
+            return 0
+        if previous and current <= self.limit:
+            # Wait until enough of the previous window has slid out
+            return max(
+                (1 - (self.limit - current) / previous) * self.window - offset, 1
+            )
+        return self.window - offset
+
+
+def create_rate_limit_backend() -> RateLimitBackend:
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisRateLimitBackend(RedisCacheBackend(settings.REDIS_URL))
+    return InMemoryRateLimitBackend(maxsize=settings.RATE_LIMIT_MAXSIZE)
+
+
+rate_limit_backend = create_rate_limit_backend()
@@ -0,0 +1,67 @@
+import heapq
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+def version_key(user_id: Any, version: int) -> str:
+    """
+    Revocation list entry for every access token of `user_id` issued at
+    token version `version`.
+    """
+    return f"{user_id}:v{version}"
+
+
+class RevocationList:
+    def __init__(self):
+        """
+        In-memory set of revoked access token ids (`jti`) and token versions
+        (`version_key`), checked on every authenticated request without a
+        database round trip.
+
+        Entries are dropped once the token would have expired anyway, so the
+        set only holds tokens that are revoked and still otherwise valid.
+        Revocations made by other workers arrive through `sync`.
+        """
+        self._expires: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+        # Newest `revoked_at` seen, the next sync only loads later rows
+        self.synced_until: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def __contains__(self, jti: Optional[str]) -> bool:
+        if jti is None or not self._expires:
+            return False
+        self._prune()
+        return jti in self._expires
+
+    def add(self, jti: str, expires_at: float) -> None:
+        if expires_at <= time.time() or jti in self._expires:
+            return
+        self._expires[jti] = expires_at
+        heapq.heappush(self._heap, (expires_at, jti))
+
+    def update(self, entries: Iterable[Tuple[str, datetime, datetime]]) -> None:
+        """
+        Add `(jti, expires_at, revoked_at)` rows loaded from the database.
+        """
+        for jti, expires_at, revoked_at in entries:
+            self.add(jti, expires_at.timestamp())
+            if self.synced_until is None or revoked_at > self.synced_until:
+                self.synced_until = revoked_at
+
+    def clear(self) -> None:
+        self._expires.clear()
+        self._heap.clear()
+        self.synced_until = None
+
+    def _prune(self) -> None:
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            _, jti = heapq.heappop(self._heap)
+            self._expires.pop(jti, None)
+
+
+revocation_list = RevocationList()
@@ -1,32 +1,109 @@
+import functools
+import uuid
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Dict, List, Sequence, Union
 
 import bcrypt
-from jose import jwt
+from argon2 import PasswordHasher as Argon2Hasher
+from argon2.exceptions import InvalidHashError, VerificationError
 
 from src.core.config import settings
+from src.core.keys import key_set
+from src.core.metrics import registry
 
-ALGORITHM = "HS256"
+JWT_ENCODED = registry.counter("jwt_encoded", "Access tokens signed")
+
+# OAuth2 scopes an access token can be granted
+SCOPES: Dict[str, str] = {
+    "me": "Read and update your own user",
+    "users": "Read and manage all users, superusers only",
+}
+
+
+def grant_scopes(requested: Sequence[str], is_superuser: bool) -> List[str]:
+    """
+    The requested scopes the user may have, in the order of `SCOPES`. All of
+    them if none were requested.
+    """
+    allowed = [scope for scope in SCOPES if scope != "users" or is_superuser]
+    if not requested:
+        return allowed
+    return [scope for scope in allowed if scope in requested]
 
 
 def create_access_token(
     subject: Union[str, Any],
     expires_delta: timedelta = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+    *,
+    is_superuser: bool = False,
+    scopes: Sequence[str] = (),
+    version: int = 0,
 ) -> str:
+    """
+    Sign an access token for `subject` carrying the claims authorization
+    needs, so requests are authorized without loading the user. `version`
+    is the user's `token_version`, revoked when these claims go stale.
+    """
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
-    to_encode = {"exp": expire, "sub": str(subject)}
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
+    to_encode = {
+        "exp": expire,
+        "sub": str(subject),
+        "jti": uuid.uuid4().hex,
+        "su": is_superuser,
+        "scope": " ".join(scopes),
+        "ver": version,
+    }
+    encoded_jwt = key_set.encode(to_encode)
+    JWT_ENCODED.inc()
     return encoded_jwt
 
 
+@functools.lru_cache
+def _argon2() -> Argon2Hasher:
+    return Argon2Hasher(
+        time_cost=settings.ARGON2_TIME_COST,
+        memory_cost=settings.ARGON2_MEMORY_COST,
+        parallelism=settings.ARGON2_PARALLELISM,
+    )
+
+
+def _is_argon2(hashed_password: str) -> bool:
+    return hashed_password.startswith("$argon2")
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
+    # The scheme and cost are read from the stored hash, so hashes made under
+    # an older policy keep working until they are upgraded
+    if _is_argon2(hashed_password):
+        try:
+            return _argon2().verify(hashed_password, plain_password)
+        except (VerificationError, InvalidHashError):
+            return False
     return bcrypt.checkpw(plain_password.encode("utf8"), hashed_password.encode("utf8"))
 
 
 def get_password_hash(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf8"), bcrypt.gensalt()).decode("utf8")
+    if settings.PASSWORD_HASH_SCHEME == "argon2id":
+        return _argon2().hash(password)
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode("utf8"), salt).decode("utf8")
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    Whether `hashed_password` was made with another scheme or other cost
+    parameters than the current policy.
+    """
+    if settings.PASSWORD_HASH_SCHEME == "argon2id":
+        return not _is_argon2(hashed_password) or _argon2().check_needs_rehash(
+            hashed_password
+        )
+    if _is_argon2(hashed_password):
+        return True
+    # $2b$<rounds>$<salt and hash>
+    return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
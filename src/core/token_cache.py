@@ -0,0 +1,86 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, NamedTuple, Optional, Set
+
+from src.core.config import settings
+
+
+class CachedToken(NamedTuple):
+    expires_at: float
+    payload: Any
+    principal: Any
+
+
+class TokenCache:
+    def __init__(self, *, maxsize: int, ttl: float):
+        """
+        LRU cache of verified bearer tokens, bounded by entry count and by both a
+        TTL and the token's own `exp` claim.
+
+        **Parameters**
+
+        * `maxsize`: Maximum number of cached tokens
+        * `ttl`: Seconds an entry may be served before the token is re-verified
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CachedToken]" = OrderedDict()
+        self._tokens_by_user: Dict[Hashable, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str) -> Optional[CachedToken]:
+        entry = self._entries.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= time.time():
+            self._remove(token)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return entry
+
+    def set(
+        self, token: str, payload: Any, principal: Any, exp: Optional[float]
+    ) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+        if token in self._entries:
+            self._remove(token)
+        self._entries[token] = CachedToken(expires_at, payload, principal)
+        self._tokens_by_user.setdefault(principal.id, set()).add(token)
+        while len(self._entries) > self.maxsize:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def invalidate_user(self, user_id: Hashable) -> None:
+        for token in self._tokens_by_user.pop(user_id, set()):
+            self._entries.pop(token, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._tokens_by_user.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _remove(self, token: str) -> None:
+        entry = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(entry.principal.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[entry.principal.id]
+
+
+token_cache = TokenCache(
+    maxsize=settings.TOKEN_CACHE_MAXSIZE, ttl=settings.TOKEN_CACHE_TTL_SECONDS
+)
@@ -1 +1,3 @@
+from .crud_outbox import outbox
+from .crud_token import refresh_token, revoked_token
 from .crud_user import user
@@ -1,12 +1,18 @@
-from typing import Any, Dict, Generic, Optional, Type, TypeVar, Union
+from typing import (Any, AsyncIterator, Dict, Generic, List, Optional,
+                    Sequence, Tuple, Type, TypeVar, Union)
 
 from pydantic import BaseModel
-from sqlalchemy import Result, and_, delete, select, update
+from sqlalchemy import (CTE, Result, RowMapping, Select, String, and_, cast,
+                        delete, func, insert, literal, select, tuple_, update)
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 from sqlalchemy.sql import expression
 
-from src.database.postgres.database import Base
+from src.crud.cache import ModelCache
+from src.crud.pagination import decode_cursor, encode_cursor
+from src.database.postgres.database import Base, is_read_only
+from src.models.outbox import OutboxEvent
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
@@ -14,16 +20,24 @@ UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
-    def __init__(self, model: Type[ModelType]):
+    def __init__(
+        self,
+        model: Type[ModelType],
+        cache: Optional[ModelCache] = None,
+        event_topic: Optional[str] = None,
+    ):
         """
         CRUD object with default methods to Create, Read, Update, Delete (CRUD).
 
         **Parameters**
 
         * `model`: A SQLAlchemy model class
-        * `schema`: A Pydantic model (schema) class
+        * `cache`: Optional cache-aside layer for single row lookups
+        * `event_topic`: Kafka topic of the outbox events written by `with_events`
         """
         self.model = model
+        self.cache = cache
+        self.event_topic = event_topic
 
     def filter_query(self, query: expression, kwargs: dict) -> expression:
         filter_list = [
@@ -31,52 +45,192 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         ]
         return query.where(and_(True, *filter_list))
 
-    async def get_one(self, session: AsyncSession, id_: int) -> Optional[ModelType]:
+    def cache_keys(self, obj: ModelType) -> List[str]:
+        return [self.cache.key("id", obj.id)]
+
+    async def invalidate(self, obj: ModelType) -> None:
+        if self.cache is not None:
+            await self.cache.invalidate(*self.cache_keys(obj))
+
+    def event_payload(self, rows: CTE) -> Dict[str, Any]:
+        return {column.key: column for column in rows.c}
+
+    def with_events(
+        self, statement: Any, events: Sequence[str], *columns: str
+    ) -> Select:
+        """
+        Run `statement`, an INSERT or UPDATE of this model, as a CTE and insert
+        an outbox event of each type in `events` for every written row. The
+        events are part of the same statement, so they commit with the rows at
+        no extra round trip.
+
+        Selects the written rows as model objects, or only `columns` if given.
+        """
+        rows = statement.returning(*self.model.__table__.columns).cte("rows")
+        if columns:
+            query = select(*(rows.c[column] for column in columns))
+        else:
+            query = select(aliased(self.model, rows))
+            query = query.execution_options(populate_existing=True)
+        payload = self.event_payload(rows)
+        for index, event_type in enumerate(events):
+            event = insert(OutboxEvent).from_select(
+                ["topic", "key", "event_type", "payload"],
+                select(
+                    literal(self.event_topic),
+                    cast(rows.c.id, String),
+                    literal(event_type),
+                    func.jsonb_build_object(
+                        *(part for item in payload.items() for part in item)
+                    ),
+                ),
+            )
+            query = query.add_cte(event.cte(f"event_{index}"))
+        return query
+
+    async def _select_one(self, session: AsyncSession, id_: Any) -> Optional[ModelType]:
         query = select(self.model).filter(self.model.id == id_)
         result = await session.execute(query)
         return result.scalar_one_or_none()
 
+    async def get_cached(
+        self, session: AsyncSession, id_: Any
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Column dict of a row from the cache, loaded on a miss. Needs `cache`.
+        Rows loaded by a read-only session are not cached, they may come from
+        a lagging replica.
+        """
+
+        async def load() -> Optional[Dict[str, Any]]:
+            obj = await self._select_one(session, id_)
+            return None if obj is None else self.cache.dump(obj)
+
+        return await self.cache.get_or_load(
+            self.cache.key("id", id_), load, store=not is_read_only(session)
+        )
+
+    async def get_one(self, session: AsyncSession, id_: Any) -> Optional[ModelType]:
+        if self.cache is None:
+            return await self._select_one(session, id_)
+        data = await self.get_cached(session, id_)
+        if data is None:
+            return None
+        return await self.cache.attach(session, self.model, data)
+
     async def get_list(
         self, session: AsyncSession, *, skip: int = 0, limit: int = 100, **kwargs
     ) -> [ModelType]:
         query = self.filter_query(query=select(self.model), kwargs=kwargs)
-        result: Result = await session.execute(query.offset(skip).limit(limit))
+        query = query.order_by(self.model.id).offset(skip).limit(limit)
+        result: Result = await session.execute(query)
         return result.scalars().all()
 
+    async def get_page(
+        self,
+        session: AsyncSession,
+        *,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        order_by: str = "id",
+        **kwargs,
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        Keyset pagination: rows are ordered by `order_by` (with `id` as a tie
+        breaker) and the page starts right after the row encoded in `cursor`,
+        so the cost does not grow with the page number. `order_by` should be an
+        indexed, non-nullable column. Returns the rows and the cursor of the
+        next page, or `None` on the last page.
+        """
+        columns = [getattr(self.model, order_by)]
+        if order_by != "id":
+            columns.append(self.model.id)
+        query = self.filter_query(query=select(self.model), kwargs=kwargs)
+        if cursor is not None:
+            values = decode_cursor(cursor, columns)
+            if len(columns) == 1:
+                query = query.where(columns[0] > values[0])
+            else:
+                query = query.where(tuple_(*columns) > tuple_(*values))
+        query = query.order_by(*columns).limit(limit + 1)
+        result: Result = await session.execute(query)
+        items = list(result.scalars().all())
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = encode_cursor([getattr(items[-1], c.key) for c in columns])
+        return items, next_cursor
+
+    async def stream(
+        self,
+        session: AsyncSession,
+        *,
+        columns: Optional[Sequence[str]] = None,
+        batch_size: int = 1000,
+        **kwargs,
+    ) -> AsyncIterator[Sequence[RowMapping]]:
+        """
+        Yield matching rows in batches of `batch_size` from a server-side
+        cursor. Rows are plain column mappings, not ORM objects, so memory use
+        stays constant however many rows are read.
+        """
+        if columns is None:
+            selected = list(self.model.__table__.columns)
+        else:
+            selected = [getattr(self.model, column) for column in columns]
+        query = self.filter_query(query=select(*selected), kwargs=kwargs)
+        query = query.order_by(self.model.id).execution_options(yield_per=batch_size)
+        result = await session.stream(query)
+        async for partition in result.mappings().partitions(batch_size):
+            yield partition
+
     async def add(
         self, session: AsyncSession, obj_in: CreateSchemaType
     ) -> Optional[ModelType]:
         model = self.model(**(obj_in if isinstance(obj_in, dict) else dict(obj_in)))
         session.add(model)
-        await session.flush()
         try:
             await session.commit()
-            return model
         except IntegrityError as e:
             await session.rollback()
             raise e
+        await self.invalidate(model)
+        return model
 
     async def update(
         self,
         session: AsyncSession,
-        id_: int,
+        id_: Any,
         data: Union[UpdateSchemaType, Dict[str, Any]],
+        events: Sequence[str] = (),
     ) -> Optional[ModelType]:
-        query = (
-            update(self.model)
-            .where(self.model.id == id_)
-            .values(**(dict(data)))
-            .returning(self.model)
-        )
-        new = await session.execute(query)
-        await session.flush()
+        """
+        Update a row with a single UPDATE ... RETURNING. Returns `None` if no
+        row has this id. An outbox event of each type in `events` is written
+        by the same statement.
+        """
+        values = dict(data)
+        if not values:
+            return await self.get_one(session, id_=id_)
+        query = update(self.model).where(self.model.id == id_).values(**values)
+        if events:
+            query = self.with_events(query, events)
+        else:
+            query = query.returning(self.model)
         try:
+            result = await session.execute(query)
+            obj = result.scalar_one_or_none()
             await session.commit()
-            return new.fetchone()
         except IntegrityError as e:
             await session.rollback()
             raise e
+        finally:
+            if self.cache is not None:
+                await self.cache.invalidate(self.cache.key("id", id_))
+        return obj
 
-    def delete(self, session: AsyncSession, *, id_: int) -> None:
-        session.execute(delete(self.model).filter(self.model.id == id_))
-        session.commit()
+    async def delete(self, session: AsyncSession, *, id_: Any) -> None:
+        await session.execute(delete(self.model).filter(self.model.id == id_))
+        await session.commit()
+        if self.cache is not None:
+            await self.cache.invalidate(self.cache.key("id", id_))
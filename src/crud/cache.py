@@ -0,0 +1,338 @@
+import abc
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import (Any, Awaitable, Callable, Dict, List, Optional, Sequence,
+                    Tuple)
+from urllib.parse import urlparse
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class CacheError(Exception):
+    pass
+
+
+class CacheBackend(abc.ABC):
+    @abc.abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abc.abstractmethod
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def delete(self, *keys: str) -> None:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryCacheBackend(CacheBackend):
+    def __init__(self, maxsize: int = 10_000):
+        """
+        Process local LRU backend, for tests and single node deployments.
+        """
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def close(self) -> None:
+        self._entries.clear()
+
+
+def encode_command(*args: Any) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode("utf8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    line = await reader.readline()
+    if not line:
+        raise CacheError("Connection closed by server")
+    prefix, body = line[:1], line[1:-2]
+    if prefix == b"+":
+        return body
+    if prefix == b"-":
+        raise CacheError(body.decode("utf8"))
+    if prefix == b":":
+        return int(body)
+    if prefix == b"$":
+        length = int(body)
+        if length == -1:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if prefix == b"*":
+        length = int(body)
+        if length == -1:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+    raise CacheError(f"Unexpected reply: {line!r}")
+
+
+class RedisCacheBackend(CacheBackend):
+    def __init__(self, url: str, pool_size: int = 10):
+        """
+        Minimal Redis protocol (RESP2) client, works with Redis, Valkey,
+        KeyDB and other compatible servers.
+
+        **Parameters**
+
+        * `url`: `redis://[:password@]host[:port][/db]`
+        * `pool_size`: Maximum number of open connections
+        """
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self._semaphore = asyncio.Semaphore(pool_size)
+        self._idle: list = []
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            await self._roundtrip(reader, writer, "AUTH", self.password)
+        if self.db:
+            await self._roundtrip(reader, writer, "SELECT", self.db)
+        return reader, writer
+
+    @staticmethod
+    async def _roundtrip(reader, writer, *args: Any) -> Any:
+        writer.write(encode_command(*args))
+        await writer.drain()
+        return await read_reply(reader)
+
+    async def execute(self, *args: Any) -> Any:
+        return (await self.pipeline(args))[0]
+
+    async def pipeline(self, *commands: Sequence[Any]) -> List[Any]:
+        """
+        Send several commands in a single round trip and return their replies.
+        """
+        async with self._semaphore:
+            conn = self._idle.pop() if self._idle else await self._connect()
+            reader, writer = conn
+            replies, error = [], None
+            try:
+                writer.write(b"".join(encode_command(*args) for args in commands))
+                await writer.drain()
+                for _ in commands:
+                    try:
+                        replies.append(await read_reply(reader))
+                    except CacheError as e:
+                        if str(e) == "Connection closed by server":
+                            raise
+                        # Keep reading so the connection stays in sync
+                        error = error or e
+                        replies.append(None)
+            except CacheError:
+                writer.close()
+                raise
+            except (OSError, asyncio.IncompleteReadError) as e:
+                writer.close()
+                raise CacheError(str(e)) from e
+            self._idle.append(conn)
+            if error is not None:
+                raise error
+            return replies
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.execute("GET", key)
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        await self.execute("SET", key, value, "EX", ttl)
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.execute("DEL", *keys)
+
+    async def close(self) -> None:
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+class ModelCache:
+    def __init__(
+        self,
+        backend: CacheBackend,
+        *,
+        namespace: str,
+        ttl: int,
+        negative_ttl: int,
+        exclude: Sequence[str] = (),
+    ):
+        """
+        Cache-aside helper for a SQLAlchemy model.
+
+        Rows are stored as JSON column dicts so they can be shared between
+        sessions and processes. Concurrent misses on the same key in this
+        process wait for a single loader call instead of each hitting the
+        database.
+
+        **Parameters**
+
+        * `backend`: Storage backend
+        * `namespace`: Key prefix, usually the table name
+        * `ttl`: Seconds a loaded row is kept
+        * `negative_ttl`: Seconds a "does not exist" result is kept
+        * `exclude`: Columns left out of cached rows, they are not loaded on
+          rows attached from the cache
+        """
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.exclude = frozenset(exclude)
+        self.hits = 0
+        self.misses = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._stale: set = set()
+
+    def key(self, *parts: Any) -> str:
+        return ":".join([self.namespace, *(str(part) for part in parts)])
+
+    async def _backend_get(self, key: str) -> Optional[bytes]:
+        try:
+            return await self.backend.get(key)
+        except (CacheError, OSError) as e:
+            logger.warning(f"Cache get failed for {key}: {e}")
+            return None
+
+    async def _backend_set(self, key: str, value: Any) -> None:
+        ttl = self.ttl if value is not None else self.negative_ttl
+        try:
+            await self.backend.set(key, json.dumps(value).encode("utf8"), ttl)
+        except (CacheError, OSError) as e:
+            logger.warning(f"Cache set failed for {key}: {e}")
+
+    async def get_or_load(
+        self, key: str, loader: Callable[[], Awaitable[Any]], *, store: bool = True
+    ) -> Any:
+        """
+        Cached value of `key`, or the result of `loader`. With `store` false
+        the loaded value is not cached, for loaders that may read stale data.
+        """
+        raw = await self._backend_get(key)
+        if raw is not None:
+            self.hits += 1
+            return json.loads(raw)
+        self.misses += 1
+        if not store:
+            return await loader()
+
+        future = self._inflight.get(key)
+        if future is not None:
+            value = await future
+            if value is not _MISSING:
+                return value
+            return await loader()
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except BaseException:
+            future.set_result(_MISSING)
+            raise
+        finally:
+            del self._inflight[key]
+        if key in self._stale:
+            self._stale.discard(key)
+        else:
+            await self._backend_set(key, value)
+        future.set_result(value)
+        return value
+
+    async def invalidate(self, *keys: str) -> None:
+        for key in keys:
+            if key in self._inflight:
+                self._stale.add(key)
+        try:
+            await self.backend.delete(*keys)
+        except (CacheError, OSError) as e:
+            logger.warning(f"Cache delete failed for {keys}: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def dump(self, obj: Any) -> Dict[str, Any]:
+        data = {}
+        for column in obj.__table__.columns:
+            if column.key in self.exclude:
+                continue
+            value = getattr(obj, column.key)
+            data[column.key] = str(value) if isinstance(value, uuid.UUID) else value
+        return data
+
+    @staticmethod
+    async def attach(session: AsyncSession, model: Any, data: Dict[str, Any]) -> Any:
+        values = {}
+        for column in model.__table__.columns:
+            if column.key not in data:
+                continue
+            value = data[column.key]
+            if value is not None and getattr(column.type, "as_uuid", False):
+                value = uuid.UUID(value)
+            values[column.key] = value
+        obj = model(**values)
+        make_transient_to_detached(obj)
+        return await session.merge(obj, load=False)
+
+
+def create_cache_backend() -> Optional[CacheBackend]:
+    if settings.USER_CACHE_BACKEND == "memory":
+        return InMemoryCacheBackend(maxsize=settings.USER_CACHE_MAXSIZE)
+    if settings.USER_CACHE_BACKEND == "redis":
+        return RedisCacheBackend(settings.REDIS_URL)
+    return None
+
+
+def create_model_cache(model: Any, exclude: Sequence[str] = ()) -> Optional[ModelCache]:
+    backend = create_cache_backend()
+    if backend is None:
+        return None
+    return ModelCache(
+        backend,
+        namespace=model.__tablename__,
+        ttl=settings.USER_CACHE_TTL_SECONDS,
+        negative_ttl=settings.USER_CACHE_NEGATIVE_TTL_SECONDS,
+        exclude=exclude,
+    )
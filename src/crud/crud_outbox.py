@@ -0,0 +1,61 @@
+import asyncio
+from typing import List, Sequence
+
+from pydantic import BaseModel
+from sqlalchemy import BigInteger, any_, bindparam, delete, func, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.crud.base import CRUDBase
+from src.models.outbox import OutboxEvent
+
+# Any constant works, it only has to be the same in every process
+RELAY_LOCK_ID = 0x6F7574626F78
+
+
+class CRUDOutbox(CRUDBase[OutboxEvent, BaseModel, BaseModel]):
+    def __init__(self, model):
+        """
+        Events are written by `CRUDBase.with_events` in the transaction that
+        changes the row and removed by the relay once Kafka acknowledged them.
+        """
+        super().__init__(model)
+        self._pending = asyncio.Event()
+
+    def notify(self) -> None:
+        """
+        Wake up the relay of this process after committing events, so they
+        don't wait for the next poll.
+        """
+        self._pending.set()
+
+    async def wait(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._pending.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._pending.clear()
+
+    async def claim(self, session: AsyncSession, *, limit: int) -> List[OutboxEvent]:
+        """
+        The oldest `limit` events, or none if another relay is publishing. The
+        lock is held until the transaction ends, so events are published in
+        order even with several workers.
+        """
+        locked = await session.scalar(
+            select(func.pg_try_advisory_xact_lock(RELAY_LOCK_ID))
+        )
+        if not locked:
+            return []
+        query = select(self.model).order_by(self.model.id).limit(limit)
+        result = await session.execute(query)
+        return list(result.scalars().all())
+
+    async def remove(self, session: AsyncSession, *, ids: Sequence[int]) -> None:
+        ids_param = bindparam("ids", list(ids), type_=ARRAY(BigInteger))
+        await session.execute(
+            delete(self.model).where(self.model.id == any_(ids_param))
+        )
+
+
+outbox = CRUDOutbox(OutboxEvent)
@@ -0,0 +1,216 @@
+import asyncio
+import hashlib
+import logging
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.core.revocation import RevocationList, revocation_list
+from src.crud.base import CRUDBase
+from src.database.postgres.database import AsyncSessionFactory
+from src.models.token import RefreshToken, RevokedToken
+from src.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# `revoked_at` is the transaction start time, so a revocation can become
+# visible after rows with a later timestamp. Every sync re-reads this window.
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf8")).hexdigest()
+
+
+class CRUDRefreshToken(CRUDBase[RefreshToken, BaseModel, BaseModel]):
+    def _add(
+        self,
+        session: AsyncSession,
+        *,
+        user_id: Any,
+        family_id: Any,
+        scope: Optional[str],
+    ) -> str:
+        token = secrets.token_urlsafe(32)
+        session.add(
+            self.model(
+                user_id=user_id,
+                token_hash=hash_token(token),
+                family_id=family_id,
+                scope=scope,
+                expires_at=datetime.now(timezone.utc)
+                + timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES),
+            )
+        )
+        return token
+
+    async def issue(
+        self, session: AsyncSession, *, user_id: Any, scope: Optional[str] = None
+    ) -> str:
+        token = self._add(session, user_id=user_id, family_id=uuid.uuid4(), scope=scope)
+        await session.commit()
+        return token
+
+    async def rotate(
+        self, session: AsyncSession, *, token: str
+    ) -> Optional[Tuple[str, uuid.UUID, Optional[str]]]:
+        """
+        Use a refresh token and issue its successor in the same family.
+        Returns the new token, the user id and the granted scope, or `None`
+        if the token is
+        unknown, expired or already used. Presenting a used token revokes
+        the whole family, since either the client or an attacker holds a
+        stolen copy.
+        """
+        token_hash = hash_token(token)
+        query = (
+            update(self.model)
+            .where(
+                self.model.token_hash == token_hash,
+                self.model.used_at.is_(None),
+                self.model.expires_at > func.now(),
+            )
+            .values(used_at=func.now())
+            .returning(self.model.user_id, self.model.family_id, self.model.scope)
+            .execution_options(synchronize_session=False)
+        )
+        row = (await session.execute(query)).one_or_none()
+        if row is None:
+            reused_family = (
+                select(self.model.family_id)
+                .where(
+                    self.model.token_hash == token_hash,
+                    self.model.used_at.is_not(None),
+                )
+                .scalar_subquery()
+            )
+            await self._revoke(session, self.model.family_id == reused_family)
+            await session.commit()
+            return None
+        new_token = self._add(
+            session, user_id=row.user_id, family_id=row.family_id, scope=row.scope
+        )
+        await session.commit()
+        return new_token, row.user_id, row.scope
+
+    async def revoke_family(self, session: AsyncSession, *, token: str) -> None:
+        family = (
+            select(self.model.family_id)
+            .where(self.model.token_hash == hash_token(token))
+            .scalar_subquery()
+        )
+        await self._revoke(session, self.model.family_id == family)
+        await session.commit()
+
+    async def revoke_user(self, session: AsyncSession, *, user_id: Any) -> None:
+        """
+        Revoke every refresh token of a user. Runs in the session's
+        transaction, to commit together with the change that calls for it.
+        """
+        await self._revoke(session, self.model.user_id == user_id)
+
+    async def _revoke(self, session: AsyncSession, criteria: Any) -> None:
+        query = (
+            update(self.model)
+            .where(criteria, self.model.used_at.is_(None))
+            .values(used_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        await session.execute(query)
+
+    async def purge_expired(self, session: AsyncSession) -> None:
+        await session.execute(
+            delete(self.model).where(self.model.expires_at <= func.now())
+        )
+        await session.commit()
+
+
+class CRUDRevokedToken(CRUDBase[RevokedToken, BaseModel, BaseModel]):
+    async def revoke(
+        self, session: AsyncSession, *, jti: str, expires_at: datetime
+    ) -> None:
+        query = (
+            insert(self.model)
+            .values(jti=jti, expires_at=expires_at)
+            .on_conflict_do_nothing(index_elements=[self.model.jti])
+        )
+        await session.execute(query)
+        await session.commit()
+        revocation_list.add(jti, expires_at.timestamp())
+
+    async def revoke_version(
+        self, session: AsyncSession, *, user_id: Any, criteria: Any = True
+    ) -> Optional[Tuple[str, datetime]]:
+        """
+        Revoke every access token of a user issued at their current token
+        version, if the user matches `criteria`. Runs in the session's
+        transaction, to commit together with the version bump; returns the
+        revocation to add to `revocation_list` once committed.
+        """
+        expires_at = func.now() + timedelta(
+            minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES,
+            seconds=settings.JWT_LEEWAY_SECONDS,
+        )
+        query = (
+            insert(self.model)
+            .from_select(
+                ["jti", "expires_at"],
+                select(
+                    func.concat(User.id, ":v", User.token_version), expires_at
+                ).where(User.id == user_id, criteria),
+            )
+            .on_conflict_do_nothing(index_elements=[self.model.jti])
+            .returning(self.model.jti, self.model.expires_at)
+        )
+        return (await session.execute(query)).one_or_none()
+
+    async def sync(self, session: AsyncSession, revocations: RevocationList) -> None:
+        """
+        Load revocations made since the last sync, by any worker.
+        """
+        query = select(
+            self.model.jti, self.model.expires_at, self.model.revoked_at
+        ).where(self.model.expires_at > func.now())
+        if revocations.synced_until is not None:
+            query = query.where(
+                self.model.revoked_at > revocations.synced_until - SYNC_OVERLAP
+            )
+        result = await session.execute(query)
+        revocations.update(result.all())
+
+    async def purge_expired(self, session: AsyncSession) -> None:
+        await session.execute(
+            delete(self.model).where(self.model.expires_at <= func.now())
+        )
+        await session.commit()
+
+
+refresh_token = CRUDRefreshToken(RefreshToken)
+revoked_token = CRUDRevokedToken(RevokedToken)
+
+
+async def run_revocation_sync() -> None:
+    """
+    Keep `revocation_list` in sync with the database and purge expired rows,
+    runs for the lifetime of the application.
+    """
+    last_purge = float("-inf")
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            async with AsyncSessionFactory() as session:
+                await revoked_token.sync(session, revocation_list)
+                if loop.time() - last_purge >= settings.TOKEN_PURGE_INTERVAL_SECONDS:
+                    await revoked_token.purge_expired(session)
+                    await refresh_token.purge_expired(session)
+                    last_purge = loop.time()
+        except Exception:
+            logger.exception("Revocation list sync failed")
+        await asyncio.sleep(settings.REVOCATION_SYNC_SECONDS)
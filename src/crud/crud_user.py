@@ -1,65 +1,263 @@
-from typing import Any, Dict, Optional, Union
+import logging
+import uuid
+from typing import Any, Dict, List, Optional, Sequence, Set, Union
 
-from sqlalchemy import select
+from sqlalchemy import CTE, Select, String, any_, bindparam, case, func, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.core.security import get_password_hash, verify_password
+from src.core.config import settings
+from src.core.exceptions import DuplicatedEntryError
+from src.core.hashing import hasher
+from src.core.metrics import registry
+from src.core.revocation import revocation_list
+from src.core.token_cache import token_cache
 from src.crud.base import CRUDBase
+from src.crud.cache import create_model_cache
+from src.crud.crud_outbox import outbox
+from src.crud.crud_token import refresh_token, revoked_token
 from src.models.user import User
-from src.schemas.user import UserCreate, UserInDB, UserUpdate
+from src.schemas.user import (Principal, UserBulkCreateResult, UserCreate,
+                              UserInDB, UserUpdate)
+
+logger = logging.getLogger(__name__)
+
+PASSWORD_REHASHED = registry.counter(
+    "password_rehashed", "Stored password hashes upgraded to the current policy"
+)
+
+USER_CREATED = "user.created"
+USER_UPDATED = "user.updated"
+USER_PASSWORD_CHANGED = "user.password_changed"
 
 
 class CRUDUser(CRUDBase[User, UserInDB, UserUpdate]):
+    def event_payload(self, rows: CTE) -> Dict[str, Any]:
+        payload = super().event_payload(rows)
+        del payload["hashed_password"]
+        del payload["token_version"]
+        return payload
+
+    def filter_query(self, query: Select, kwargs: dict) -> Select:
+        kwargs = dict(kwargs)
+        if "email" in kwargs:
+            email = kwargs.pop("email")
+            query = query.where(func.lower(self.model.email) == email.lower())
+        return super().filter_query(query, kwargs)
+
+    def _email_query(self, email: str) -> Select:
+        # Compares lower(email), the expression of the unique index
+        return select(self.model).where(func.lower(self.model.email) == email.lower())
+
     async def get_by_email(
         self, session: AsyncSession, *, email: str
     ) -> Optional[User]:
-        query = select(self.model).filter(self.model.email == email)
-        result = await session.execute(query)
+        result = await session.execute(self._email_query(email))
         return result.scalar_one_or_none()
 
     async def authenticate(
         self, session: AsyncSession, *, email: str, password: str
     ) -> Optional[User]:
+        # Credentials always come from the primary, never from the cache,
+        # so a changed password takes effect on every worker at once
         user: User = await self.get_by_email(session, email=email)
         if not user:
+            # Same cost as a wrong password, so response times don't reveal
+            # which emails are registered
+            await hasher.verify_dummy(password)
             return None
-        if not verify_password(password, user.hashed_password):
+        if not await hasher.verify(password, user.hashed_password):
             return None
+        if hasher.needs_rehash(user.hashed_password):
+            user = await self._rehash(session, user, password)
         return user
 
+    async def _rehash(self, session: AsyncSession, user: User, password: str) -> User:
+        # The plain password is only available here, so hashes made under an
+        # older policy are upgraded on login. A failure must not fail the login.
+        try:
+            hashed_password = await hasher.hash(password)
+            updated = await super().update(
+                session, id_=user.id, data={"hashed_password": hashed_password}
+            )
+        except Exception:
+            logger.exception(f"Password rehash failed for user {user.id}")
+            return user
+        PASSWORD_REHASHED.inc()
+        return updated or user
+
     async def add(self, session: AsyncSession, *, obj_in: UserCreate) -> User:
-        model = User(
-            email=obj_in.email,
-            hashed_password=get_password_hash(obj_in.password),
-            full_name=obj_in.full_name,
-            is_superuser=obj_in.is_superuser,
+        query = self.with_events(
+            insert(self.model).values(
+                id=uuid.uuid4(),
+                email=obj_in.email,
+                hashed_password=await hasher.hash(obj_in.password),
+                full_name=obj_in.full_name,
+                is_superuser=obj_in.is_superuser,
+            ),
+            [USER_CREATED],
         )
-        session.add(model)
-        await session.commit()
-        await session.flush()
-
+        # The unique email constraint is the duplicate check, no SELECT first
         try:
+            model = (await session.execute(query)).scalar_one()
             await session.commit()
-            return model
-        except IntegrityError as e:
+        except IntegrityError:
             await session.rollback()
-            raise e
+            raise DuplicatedEntryError("A user with this email already exists")
+        outbox.notify()
+        return model
+
+    def _existing_emails_query(self, emails: Sequence[str]) -> Select:
+        # A single array parameter instead of IN (...), which would hit the
+        # 32767 bind parameter limit for large imports.
+        emails_param = bindparam(
+            "emails", [email.lower() for email in emails], type_=ARRAY(String)
+        )
+        lower_email = func.lower(self.model.email)
+        return select(lower_email).where(lower_email == any_(emails_param))
+
+    async def _existing_emails(
+        self, session: AsyncSession, emails: Sequence[str]
+    ) -> Set[str]:
+        """
+        The lowercased `emails` that are already registered, in any case.
+        """
+        result = await session.execute(self._existing_emails_query(emails))
+        return set(result.scalars().all())
+
+    async def add_many(
+        self,
+        session: AsyncSession,
+        *,
+        objs_in: Sequence[UserCreate],
+        batch_size: Optional[int] = None,
+    ) -> List[UserBulkCreateResult]:
+        """
+        Create many users, committing every `batch_size` rows. Emails that
+        already exist, or appear earlier in `objs_in`, are reported as
+        duplicates instead of failing the whole import. Each batch is hashed
+        before the session is used, so no transaction stays open while bcrypt
+        runs; a failure leaves the batches committed before it in place.
+        """
+        batch_size = batch_size or settings.BULK_CREATE_BATCH_SIZE
+        results: List[Optional[UserBulkCreateResult]] = [None] * len(objs_in)
+        seen: Set[str] = set()
+        pending: List[int] = []
+        for index, obj_in in enumerate(objs_in):
+            if obj_in.email.lower() in seen:
+                results[index] = UserBulkCreateResult(
+                    index=index, email=obj_in.email, status="duplicate"
+                )
+            else:
+                seen.add(obj_in.email.lower())
+                pending.append(index)
+
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start : start + batch_size]
+            hashed = await hasher.hash_many([objs_in[i].password for i in batch])
+            existing = await self._existing_emails(
+                session, [objs_in[i].email for i in batch]
+            )
+            rows = []
+            for i, hashed_password in zip(batch, hashed):
+                if objs_in[i].email.lower() in existing:
+                    results[i] = UserBulkCreateResult(
+                        index=i, email=objs_in[i].email, status="duplicate"
+                    )
+                    continue
+                rows.append(
+                    dict(
+                        id=uuid.uuid4(),
+                        email=objs_in[i].email,
+                        hashed_password=hashed_password,
+                        full_name=objs_in[i].full_name,
+                        is_superuser=objs_in[i].is_superuser,
+                    )
+                )
+            batch = [i for i in batch if results[i] is None]
+            if not rows:
+                await session.commit()
+                continue
+            # Rows inserted concurrently by someone else are skipped, not fatal
+            query = self.with_events(
+                insert(self.model)
+                .values(rows)
+                .on_conflict_do_nothing(index_elements=[func.lower(self.model.email)]),
+                [USER_CREATED],
+                "id",
+            )
+            inserted = set((await session.execute(query)).scalars().all())
+            created: List[str] = []
+            for index, row in zip(batch, rows):
+                if row["id"] in inserted:
+                    created.append(row["email"])
+                    results[index] = UserBulkCreateResult(
+                        index=index, email=row["email"], status="created", id=row["id"]
+                    )
+                else:
+                    results[index] = UserBulkCreateResult(
+                        index=index, email=row["email"], status="duplicate"
+                    )
+            await session.commit()
+            if created:
+                outbox.notify()
+        return results
 
     async def update(
-        self, session: AsyncSession, id_: int, obj_in: Union[UserUpdate, Dict[str, Any]]
+        self, session: AsyncSession, id_: Any, obj_in: Union[UserUpdate, Dict[str, Any]]
     ) -> Optional[User]:
         if isinstance(obj_in, dict):
-            update_data = obj_in
+            update_data = dict(obj_in)
         else:
             update_data = obj_in.model_dump(exclude_unset=True)
-        if update_data["password"]:
-            update_data["hashed_password"] = get_password_hash(update_data["password"])
-            del update_data["password"]
-        return await super().update(session, id_=id_, data=update_data)
+        password = update_data.pop("password", None)
+        events = [USER_UPDATED] if update_data else []
+        if password:
+            update_data["hashed_password"] = await hasher.hash(password)
+            events.append(USER_PASSWORD_CHANGED)
+            # A stolen refresh token must not outlive a password change
+            await refresh_token.revoke_user(session, user_id=id_)
+        revoked = None
+        if "is_superuser" in update_data:
+            # Access tokens carry the role, a change retires the ones issued
+            # at the current version
+            changed = User.is_superuser.is_distinct_from(update_data["is_superuser"])
+            update_data["token_version"] = User.token_version + case(
+                (changed, 1), else_=0
+            )
+            revoked = await revoked_token.revoke_version(
+                session, user_id=id_, criteria=changed
+            )
+        try:
+            user = await super().update(
+                session, id_=id_, data=update_data, events=events
+            )
+        except IntegrityError:
+            raise DuplicatedEntryError("A user with this email already exists")
+        if user is not None and events:
+            outbox.notify()
+        if revoked is not None:
+            revocation_list.add(revoked.jti, revoked.expires_at.timestamp())
+        token_cache.invalidate_user(id_)
+        return user
 
-    async def is_superuser(self, user: User) -> bool:
+    async def is_superuser(self, user: Union[User, Principal]) -> bool:
         return user.is_superuser
 
 
-user = CRUDUser(User)
+user = CRUDUser(
+    User,
+    # Credentials are read from the primary only, so they stay out of the
+    # shared cache
+    cache=create_model_cache(User, exclude=("hashed_password",)),
+    event_topic=settings.KAFKA_USER_EVENTS_TOPIC,
+)
+
+if user.cache is not None:
+    registry.callback_counter(
+        "user_cache_lookups",
+        "User cache lookups",
+        lambda: {("hit",): user.cache.hits, ("miss",): user.cache.misses},
+        ("result",),
+    )
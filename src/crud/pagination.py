@@ -0,0 +1,41 @@
+import base64
+import binascii
+import json
+import uuid
+from typing import Any, List, Sequence
+
+from sqlalchemy import Column
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    data = [str(value) if isinstance(value, uuid.UUID) else value for value in values]
+    raw = json.dumps(data, separators=(",", ":")).encode("utf8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence[Column]) -> List[Any]:
+    """
+    Decode a cursor produced by `encode_cursor` back into column values.
+    Raises `ValueError` for anything that was not produced by us.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError("Invalid cursor")
+    return [_decode_value(column, value) for column, value in zip(columns, values)]
+
+
+def _decode_value(column: Column, value: Any) -> Any:
+    if getattr(column.type, "as_uuid", False):
+        if not isinstance(value, str):
+            raise ValueError("Invalid cursor")
+        try:
+            return uuid.UUID(value)
+        except ValueError as e:
+            raise ValueError("Invalid cursor") from e
+    if value is None or isinstance(value, (list, dict)):
+        raise ValueError("Invalid cursor")
+    return value
@@ -0,0 +1,35 @@
+import asyncio
+import logging
+import time
+import uuid
+
+from src.core.revocation import revocation_list
+from src.crud.crud_token import revoked_token
+from src.crud.crud_user import user
+from src.database.postgres.database import AsyncSessionFactory
+
+logger = logging.getLogger(__name__)
+
+
+async def _warm_connection() -> None:
+    async with AsyncSessionFactory() as session:
+        # Lookups that match no row, they only fill SQLAlchemy's compiled
+        # cache and asyncpg's prepared statements of this connection
+        await user._select_one(session, uuid.uuid4())
+        await user.get_by_email(session, email="warm-up@invalid")
+
+
+async def warm_up(connections: int) -> None:
+    """
+    Open `connections` pool connections at once and run the hot queries on
+    each, then load the revocation list, so the first requests after a
+    deploy don't pay for connection setup and statement preparation.
+    """
+    start = time.perf_counter()
+    await asyncio.gather(*(_warm_connection() for _ in range(connections)))
+    async with AsyncSessionFactory() as session:
+        await revoked_token.sync(session, revocation_list)
+    logger.info(
+        f"Warmed up {connections} database connections in "
+        f"{(time.perf_counter() - start) * 1000:.0f}ms"
+    )
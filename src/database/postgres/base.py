@@ -1,4 +1,6 @@
 # Import all the models, so that Base has them before being
 # imported by Alembic
 from src.database.postgres.database import Base
+from src.models.outbox import OutboxEvent  # noqa
+from src.models.token import RefreshToken, RevokedToken  # noqa
 from src.models.user import User  # noqa
@@ -1,11 +1,14 @@
-from typing import Any
+from typing import Any, Dict
 
 from sqlalchemy import MetaData
-from sqlalchemy.ext.asyncio import (AsyncSession, async_sessionmaker,
-                                    create_async_engine)
+from sqlalchemy.ext.asyncio import (AsyncEngine, AsyncSession,
+                                    async_sessionmaker, create_async_engine)
 from sqlalchemy.orm import DeclarativeBase, declared_attr
 
 from src.core.config import settings
+from src.core.instrumentation import instrument_engine
+from src.core.metrics import registry
+from src.database.postgres.pool import InstrumentedQueuePool
 
 POSTGRES_INDEXES_NAMING_CONVENTION = {
     "ix": "%(column_0_label)s_idx",
@@ -17,10 +20,30 @@ POSTGRES_INDEXES_NAMING_CONVENTION = {
 
 metadata = MetaData(naming_convention=POSTGRES_INDEXES_NAMING_CONVENTION)
 
-engine = create_async_engine(
-    settings.ASYNC_DATABASE_URL,
-    echo=True,
-)
+
+def create_engine(url: str) -> AsyncEngine:
+    """
+    Engine with the pool and instrumentation settings, for the primary and
+    every replica.
+    """
+    engine = create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        },
+    )
+    instrument_engine(engine)
+    return engine
+
+
+engine = create_engine(settings.ASYNC_DATABASE_URL)
 
 
 class Base(DeclarativeBase):
@@ -39,6 +62,40 @@ AsyncSessionFactory = async_sessionmaker(
 )
 
 
+def is_read_only(session: AsyncSession) -> bool:
+    """
+    Whether `session` may read from a replica, what it reads can lag behind
+    the primary.
+    """
+    return session.info.get("read_only", False)
+
+
+def pool_stats() -> Dict[str, Any]:
+    return engine.sync_engine.pool.stats()
+
+
+registry.gauge(
+    "db_pool_connections",
+    "Database pool connections by state",
+    lambda: {
+        (state,): pool_stats()[state]
+        for state in ("size", "checked_in", "checked_out", "overflow")
+    },
+    ("state",),
+)
+registry.callback_counter(
+    "db_pool_checkouts", "Connections handed out", lambda: pool_stats()["checkouts"]
+)
+registry.callback_counter(
+    "db_pool_timeouts", "Checkouts that timed out", lambda: pool_stats()["timeouts"]
+)
+registry.callback_counter(
+    "db_pool_wait_seconds",
+    "Total time spent waiting for a connection",
+    lambda: pool_stats()["wait_seconds_total"],
+)
+
+
 async def init_tables():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
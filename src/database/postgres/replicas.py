@@ -0,0 +1,153 @@
+import asyncio
+import contextvars
+import logging
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import (AsyncEngine, AsyncSession,
+                                    async_sessionmaker)
+from sqlalchemy.orm import Session
+
+from src.core.config import settings
+from src.core.metrics import registry
+from src.database.postgres.database import create_engine, engine
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind, 0 when it replayed everything it received
+# (an idle primary writes nothing to replay) or is not a replica at all
+REPLICATION_LAG = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+    " END"
+)
+
+# Who the current request reads for, set once the access token is decoded
+reader_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "reader_id", default=None
+)
+
+
+class ReplicaSet:
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replicas: Sequence[AsyncEngine] = (),
+        *,
+        max_lag: float = 10,
+        sticky_seconds: float = 10,
+        check_timeout: float = 2,
+    ):
+        """
+        Routes reads round-robin over the replicas that passed the last
+        health check, or to the primary if none did. Replicas start out
+        healthy so a restart doesn't wait for the first check.
+
+        **Parameters**
+
+        * `primary`: Engine of the primary, takes all writes
+        * `replicas`: Engines of the read replicas
+        * `max_lag`: Seconds of replication lag before a replica is skipped
+        * `sticky_seconds`: How long reads of a user who wrote stay on the
+          primary, so they see their own writes
+        * `check_timeout`: Seconds a replica has to answer a health check
+        """
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.max_lag = max_lag
+        self.sticky_seconds = sticky_seconds
+        self.check_timeout = check_timeout
+        self._healthy: List[AsyncEngine] = list(self.replicas)
+        self._next = 0
+        self._sticky: Dict[str, float] = {}
+
+    @property
+    def healthy(self) -> List[AsyncEngine]:
+        return list(self._healthy)
+
+    def stick(self, key: Any) -> None:
+        if not self.replicas:
+            return
+        now = time.monotonic()
+        # Drop expired entries while we're here, keeps the dict bounded
+        if len(self._sticky) > 1000:
+            self._sticky = {k: t for k, t in self._sticky.items() if t > now}
+        self._sticky[str(key)] = now + self.sticky_seconds
+
+    def is_sticky(self, key: Any) -> bool:
+        if key is None:
+            return False
+        until = self._sticky.get(str(key))
+        return until is not None and until > time.monotonic()
+
+    def choose(self, key: Any = None) -> AsyncEngine:
+        """
+        Engine for a read on behalf of `key`, usually the user id.
+        """
+        healthy = self._healthy
+        if not healthy or self.is_sticky(key):
+            return self.primary
+        self._next = (self._next + 1) % len(healthy)
+        return healthy[self._next]
+
+    async def _lag(self, replica: AsyncEngine) -> float:
+        async with replica.connect() as conn:
+            return float(await conn.scalar(REPLICATION_LAG))
+
+    async def check(self) -> None:
+        healthy = []
+        for replica in self.replicas:
+            try:
+                lag = await asyncio.wait_for(self._lag(replica), self.check_timeout)
+            except Exception as e:
+                logger.warning(f"Replica {replica.url.host} failed its check: {e}")
+                continue
+            if lag > self.max_lag:
+                logger.warning(f"Replica {replica.url.host} is {lag:.1f}s behind")
+                continue
+            healthy.append(replica)
+        self._healthy = healthy
+
+    async def run_health_checks(self, interval: float) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(interval)
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.dispose()
+
+
+class ReadSession(Session):
+    """
+    Session for read-only work. The engine is chosen on first use, once the
+    reader is known, and kept for the rest of the session.
+    """
+
+    def get_bind(self, mapper=None, **kw):
+        bind = self.info.get("bind")
+        if bind is None:
+            bind = self.info["bind"] = replica_set.choose(reader_id.get()).sync_engine
+        return bind
+
+
+replica_set = ReplicaSet(
+    engine,
+    [create_engine(url) for url in settings.DB_REPLICA_URLS],
+    max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS,
+    sticky_seconds=settings.DB_READ_YOUR_WRITES_SECONDS,
+)
+
+ReadSessionFactory = async_sessionmaker(
+    class_=AsyncSession,
+    sync_session_class=ReadSession,
+    expire_on_commit=False,
+    info={"read_only": True},
+)
+
+registry.gauge(
+    "db_replicas_healthy",
+    "Read replicas passing health checks",
+    lambda: len(replica_set.healthy),
+)
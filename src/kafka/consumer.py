@@ -1,88 +1,240 @@
 import asyncio
 import json
 import logging
-from random import randint
-from typing import Any, Set
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
 from aiokafka import AIOKafkaConsumer
-from aiokafka.structs import TopicPartition
+from aiokafka.errors import KafkaError
+from aiokafka.structs import ConsumerRecord, TopicPartition
 
 from src.core.config import settings
+from src.core.metrics import registry
 
 logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO
 )
 logger = logging.getLogger(__name__)
 
+Handler = Callable[[TopicPartition, List[ConsumerRecord]], Awaitable[None]]
+
 # global variables
 consumer_task = None
 consumer = None
 _state = 0
+_lag: Dict[Tuple[str, str], int] = {}
+
+registry.gauge(
+    "kafka_consumer_lag",
+    "Messages between the consumer position and the partition end",
+    lambda: dict(_lag),
+    ("topic", "partition"),
+)
+BATCH_FAILURES = registry.counter(
+    "kafka_consumer_batch_failures",
+    "Partition batches that failed and will be redelivered",
+    ("topic",),
+)
+
+
+class ConsumerEngine:
+    def __init__(
+        self,
+        consumer: Any,
+        handler: Handler,
+        *,
+        max_records: int = 500,
+        timeout_ms: int = 1000,
+        retry_backoff: float = 1,
+    ):
+        """
+        Consume every assigned partition in batches. The records of a batch
+        are grouped by partition and the partitions handled concurrently, the
+        records of one partition in order. Offsets are committed once a
+        partition's records were handled, a failed partition is rewound and
+        redelivered by a later poll.
+
+        The group coordinator rebalances in the background, so partitions can
+        be revoked while a batch is handled. Only partitions still assigned
+        are rewound and committed, a failed commit is logged and the records
+        are redelivered to whichever consumer owns the partition next.
+
+        **Parameters**
+
+        * `consumer`: Started `AIOKafkaConsumer` with auto commit disabled
+        * `handler`: Called with a partition and its records, in offset order
+        * `max_records`: Records fetched per poll, across all partitions
+        * `timeout_ms`: Longest wait for records per poll
+        * `retry_backoff`: Seconds to wait after a failed batch
+        """
+        self.consumer = consumer
+        self.handler = handler
+        self.max_records = max_records
+        self.timeout_ms = timeout_ms
+        self.retry_backoff = retry_backoff
+
+    async def _handle(
+        self, tp: TopicPartition, records: List[ConsumerRecord]
+    ) -> Optional[int]:
+        try:
+            await self.handler(tp, records)
+        except Exception:
+            BATCH_FAILURES.labels(tp.topic).inc()
+            logger.exception(
+                f"Failed to process {len(records)} records of {tp.topic}[{tp.partition}]"
+                f" from offset {records[0].offset}"
+            )
+            if tp in self.consumer.assignment():
+                self.consumer.seek(tp, records[0].offset)
+            return None
+        return records[-1].offset + 1
+
+    def _update_lag(self, positions: Dict[TopicPartition, int]) -> None:
+        assigned = {(tp.topic, str(tp.partition)) for tp in self.consumer.assignment()}
+        for key in list(_lag):
+            if key not in assigned:
+                del _lag[key]
+        for tp, position in positions.items():
+            if (tp.topic, str(tp.partition)) not in assigned:
+                continue
+            highwater = self.consumer.highwater(tp)
+            if highwater is not None:
+                _lag[(tp.topic, str(tp.partition))] = highwater - position
+
+    async def process_batch(self) -> int:
+        """
+        Poll once, handle and commit the records. Returns how many were
+        handled successfully.
+        """
+        batches = await self.consumer.getmany(
+            timeout_ms=self.timeout_ms, max_records=self.max_records
+        )
+        if not batches:
+            return 0
+        results = await asyncio.gather(
+            *(self._handle(tp, records) for tp, records in batches.items())
+        )
+        handled = [tp for tp, offset in zip(batches, results) if offset is not None]
+        assigned = self.consumer.assignment()
+        offsets = {
+            tp: offset
+            for tp, offset in zip(batches, results)
+            if offset is not None and tp in assigned
+        }
+        if offsets:
+            try:
+                await self.consumer.commit(offsets)
+            except KafkaError:
+                # CommitFailedError and IllegalStateError when a rebalance
+                # revoked the partitions meanwhile
+                logger.warning(
+                    f"Failed to commit offsets {offsets}, the records will be "
+                    f"redelivered",
+                    exc_info=True,
+                )
+            else:
+                self._update_lag(offsets)
+        if len(handled) < len(batches):
+            await asyncio.sleep(self.retry_backoff)
+        return sum(len(batches[tp]) for tp in handled)
+
+    async def run(self) -> None:
+        try:
+            while True:
+                await self.process_batch()
+        finally:
+            logger.warning("Stopping consumer")
+            await self.consumer.stop()
+
+
+def _update_state(message: Any) -> None:
+    value = json.loads(message.value)
+    global _state
+    _state = value
+
+
+async def update_state(tp: TopicPartition, records: List[ConsumerRecord]) -> None:
+    logger.debug(f"Consumed {len(records)} records from {tp.topic}[{tp.partition}]")
+    # Only the newest message matters for the state
+    _update_state(records[-1])
+
+
+async def _load_state() -> None:
+    # A consumer outside the group reads the newest message of every partition
+    # without moving the group's committed offsets
+    reader = AIOKafkaConsumer(
+        bootstrap_servers=f"{settings.KAFKA_HOST}:{settings.KAFKA_PORT}",
+        enable_auto_commit=False,
+    )
+    await reader.start()
+    try:
+        partitions = [
+            TopicPartition(settings.KAFKA_TOPIC, partition)
+            for partition in await reader.partitions_for_topic(settings.KAFKA_TOPIC)
+            or ()
+        ]
+        end_offsets = await reader.end_offsets(partitions)
+        partitions = [tp for tp in partitions if end_offsets[tp] > 0]
+        if not partitions:
+            logger.warning(
+                f"Topic ({settings.KAFKA_TOPIC}) has no messages, skipping "
+                f"initialization ..."
+            )
+            return
+        reader.assign(partitions)
+        for tp in partitions:
+            reader.seek(tp, end_offsets[tp] - 1)
+        newest = None
+        while partitions:
+            batches = await reader.getmany(*partitions, timeout_ms=1000)
+            if not batches:
+                break
+            for tp, records in batches.items():
+                partitions.remove(tp)
+                if newest is None or records[-1].timestamp > newest.timestamp:
+                    newest = records[-1]
+        if newest is not None:
+            logger.info(f"Initializing API with data from msg: {newest}")
+            _update_state(newest)
+    finally:
+        await reader.stop()
 
 
 async def initialize():
-    loop = asyncio.get_event_loop()
     global consumer
-    group_id = f"{settings.KAFKA_CONSUMER_GROUP_PREFIX}-{randint(0, 10000)}"
+    # A stable group id, so instances share the partitions and a restart
+    # resumes from the committed offsets
+    group_id = f"{settings.KAFKA_CONSUMER_GROUP_PREFIX}-{settings.KAFKA_TOPIC}"
     logger.debug(
         f"Initializing KafkaConsumer for topic {settings.KAFKA_TOPIC}, group_id {group_id}"
         f" and using bootstrap servers {settings.KAFKA_HOST}:{settings.KAFKA_PORT}"
     )
+    await _load_state()
     consumer = AIOKafkaConsumer(
         settings.KAFKA_TOPIC,
-        loop=loop,
         bootstrap_servers=f"{settings.KAFKA_HOST}:{settings.KAFKA_PORT}",
         group_id=group_id,
+        enable_auto_commit=False,
+        auto_offset_reset="latest",
     )
     # get cluster layout and join group
     await consumer.start()
 
-    partitions: Set[TopicPartition] = consumer.assignment()
-    nr_partitions = len(partitions)
-    if nr_partitions != 1:
-        logger.warning(
-            f"Found {nr_partitions} partitions for topic {settings.KAFKA_TOPIC}. Expecting "
-            f"only one, remaining partitions will be ignored!"
-        )
-    for tp in partitions:
-        # get the log_end_offset
-        end_offset_dict = await consumer.end_offsets([tp])
-        end_offset = end_offset_dict[tp]
-
-        if end_offset == 0:
-            logger.warning(
-                f"Topic ({settings.KAFKA_TOPIC}) has no messages (log_end_offset: "
-                f"{end_offset}), skipping initialization ..."
-            )
-            return
-
-        logger.debug(f"Found log_end_offset: {end_offset} seeking to {end_offset-1}")
-        consumer.seek(tp, end_offset - 1)
-        msg = await consumer.getone()
-        logger.info(f"Initializing API with data from msg: {msg}")
-
-        # update the API state
-        _update_state(msg)
-        return
-
-
-def _update_state(message: Any) -> None:
-    value = json.loads(message.value)
-    global _state
-    _state = value
-
-
-async def send_consumer_message(consumer: AIOKafkaConsumer):
-    try:
-        # consume messages
-        async for msg in consumer:
-            logger.info(f"Consumed msg: {msg}")
-            _update_state(msg)
-    finally:
-        logger.warning("Stopping consumer")
-        await consumer.stop()
-
 
 async def consume():
     global consumer_task
-    consumer_task = asyncio.create_task(send_consumer_message(consumer))
+    engine = ConsumerEngine(
+        consumer,
+        update_state,
+        max_records=settings.KAFKA_CONSUMER_MAX_RECORDS,
+        timeout_ms=settings.KAFKA_CONSUMER_TIMEOUT_MS,
+    )
+    consumer_task = asyncio.create_task(engine.run())
+
+
+async def stop():
+    if consumer_task is not None:
+        consumer_task.cancel()
+        try:
+            await consumer_task
+        except asyncio.CancelledError:
+            pass
@@ -4,9 +4,20 @@ from aiokafka import AIOKafkaProducer
 
 from src.core.config import settings
 
-producer = AIOKafkaProducer(
-    bootstrap_servers=[
-        f"{settings.KAFKA_HOST}:{settings.KAFKA_PORT}",
-    ],
-    value_serializer=lambda v: json.dumps(v).encode("utf-8"),
-)
+
+def create_producer() -> AIOKafkaProducer:
+    """
+    The producer binds to the running event loop, create it from a coroutine.
+    """
+    return AIOKafkaProducer(
+        bootstrap_servers=[
+            f"{settings.KAFKA_HOST}:{settings.KAFKA_PORT}",
+        ],
+        value_serializer=lambda v: json.dumps(v).encode("utf-8"),
+        key_serializer=lambda k: k.encode("utf-8") if k is not None else None,
+        acks="all",
+        enable_idempotence=True,
+        compression_type=settings.KAFKA_COMPRESSION_TYPE,
+        linger_ms=settings.KAFKA_LINGER_MS,
+        max_batch_size=settings.KAFKA_MAX_BATCH_SIZE,
+    )
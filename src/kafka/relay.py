@@ -0,0 +1,122 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict
+
+from src.core.config import settings
+from src.core.metrics import registry
+from src.crud.crud_outbox import outbox
+from src.database.postgres.database import AsyncSessionFactory
+from src.kafka.producer import create_producer
+from src.models.outbox import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+EVENTS_PUBLISHED = registry.counter(
+    "outbox_events_published", "Outbox events acknowledged by Kafka"
+)
+RELAY_ERRORS = registry.counter(
+    "outbox_relay_errors", "Failed attempts to publish a batch of outbox events"
+)
+
+
+def event_message(event: OutboxEvent) -> Dict[str, Any]:
+    # Delivery is at least once, consumers deduplicate on the event id
+    return {
+        "id": event.id,
+        "type": event.event_type,
+        "occurred_at": event.created_at.isoformat(),
+        "data": event.payload,
+    }
+
+
+class OutboxRelay:
+    def __init__(
+        self,
+        producer_factory: Callable[[], Any],
+        *,
+        session_factory: Callable[[], Any] = AsyncSessionFactory,
+        batch_size: int = 500,
+        poll_interval: float = 1,
+        max_backoff: float = 60,
+    ):
+        """
+        Publish outbox events to Kafka in the background. A batch is handed
+        to the producer at once, which groups it into compressed requests,
+        and deleted when every message was acknowledged. While Kafka is
+        unreachable events stay in the table and are retried with backoff.
+
+        **Parameters**
+
+        * `producer_factory`: Returns an unstarted `AIOKafkaProducer`
+        * `session_factory`: Database sessions
+        * `batch_size`: Events read per transaction
+        * `poll_interval`: Seconds between checks for new events
+        * `max_backoff`: Longest wait between retries after a failure
+        """
+        self.producer_factory = producer_factory
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+
+    async def publish_batch(self, producer: Any) -> int:
+        """
+        Publish the oldest pending events and return how many were sent.
+        """
+        async with self.session_factory() as session:
+            events = await outbox.claim(session, limit=self.batch_size)
+            if not events:
+                return 0
+            # `send` only queues the message, the returned futures resolve
+            # once the broker acknowledged the batch it was sent in
+            deliveries = [
+                await producer.send(event.topic, event_message(event), key=event.key)
+                for event in events
+            ]
+            await asyncio.gather(*deliveries)
+            await outbox.remove(session, ids=[event.id for event in events])
+            await session.commit()
+        EVENTS_PUBLISHED.inc(len(events))
+        return len(events)
+
+    async def _start_producer(self) -> Any:
+        producer = self.producer_factory()
+        try:
+            await producer.start()
+        except BaseException:
+            await producer.stop()
+            raise
+        return producer
+
+    async def run(self) -> None:
+        """
+        Relay events until cancelled.
+        """
+        producer = None
+        backoff = self.poll_interval
+        try:
+            while True:
+                try:
+                    if producer is None:
+                        producer = await self._start_producer()
+                    published = await self.publish_batch(producer)
+                except Exception:
+                    RELAY_ERRORS.inc()
+                    logger.exception(f"Outbox relay failed, retrying in {backoff}s")
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, self.max_backoff)
+                    continue
+                backoff = self.poll_interval
+                if published < self.batch_size:
+                    await outbox.wait(self.poll_interval)
+        finally:
+            if producer is not None:
+                await producer.stop()
+
+
+outbox_relay = OutboxRelay(
+    create_producer,
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    poll_interval=settings.OUTBOX_POLL_SECONDS,
+    max_backoff=settings.OUTBOX_MAX_BACKOFF_SECONDS,
+)
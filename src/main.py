@@ -1,23 +1,77 @@
 import asyncio
+import contextlib
 import logging
+from typing import AsyncIterator
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from starlette.middleware.cors import CORSMiddleware
 
+from src import crud
 from src.api.api_v1.api import api_router
+from src.api.responses import DefaultResponse
 from src.core.config import app_configs, settings
-from src.database.postgres.database import init_tables
+from src.core.exceptions import ServiceUnavailableException
+from src.core.hashing import hasher
+from src.core.instrumentation import QueryStatsMiddleware
+from src.core.keys import key_set
+from src.core.metrics import CONTENT_TYPE, registry
+from src.crud.crud_token import run_revocation_sync
+from src.crud.warmup import warm_up
+from src.database.postgres.database import engine, init_tables
+from src.database.postgres.replicas import replica_set
 from src.kafka.consumer import consume as kafka_consume
-from src.kafka.consumer import consumer as kafka_consumer
 from src.kafka.consumer import initialize as kafka_initialize
-from src.kafka.producer import producer as kafka_producer
+from src.kafka.consumer import stop as kafka_stop
+from src.kafka.relay import outbox_relay
 
 logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO
 )
 log = logging.getLogger(__name__)
 
-app = FastAPI(**app_configs)
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    log.info("Initializing API ...")
+    app.state.ready = False
+    # Drop connections inherited from a parent process (e.g. gunicorn
+    # --preload) without closing them, every worker opens its own
+    await engine.dispose(close=False)
+    if settings.ENVIRONMENT in settings.CREATE_TABLES_ENVIRONMENT:
+        await init_tables()
+    await warm_up(min(settings.DB_WARMUP_CONNECTIONS, settings.DB_POOL_SIZE))
+    await hasher.warm_up()
+    tasks = [asyncio.create_task(run_revocation_sync())]
+    if replica_set.replicas:
+        tasks.append(
+            asyncio.create_task(
+                replica_set.run_health_checks(settings.DB_REPLICA_CHECK_SECONDS)
+            )
+        )
+    if settings.OUTBOX_RELAY_ENABLED:
+        tasks.append(asyncio.create_task(outbox_relay.run()))
+    if settings.KAFKA_CONSUMER_ENABLED:
+        await kafka_initialize()
+        await kafka_consume()
+    app.state.ready = True
+    log.info("API ready")
+    try:
+        yield
+    finally:
+        app.state.ready = False
+        await kafka_stop()
+        # Cancelling the relay stops its producer, which flushes queued messages
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        hasher.shutdown()
+        if crud.user.cache is not None:
+            await crud.user.cache.backend.close()
+        await replica_set.dispose()
+        await engine.dispose()
+
+
+app = FastAPI(default_response_class=DefaultResponse, lifespan=lifespan, **app_configs)
 
 
 # Set all CORS enabled origins
@@ -28,21 +82,35 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
     )
 
+app.add_middleware(QueryStatsMiddleware, server_timing=settings.SERVER_TIMING_ENABLED)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 
-@app.on_event("startup")
-async def startup():
-    log.info("Initializing API ...")
-    asyncio.create_task(init_tables())
-    # await kafka_producer.start()
-    # await kafka_initialize()
-    # await kafka_consume()
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
 
+@app.get("/ready", include_in_schema=False)
+async def ready(request: Request) -> dict:
+    # Only once connections, statements and background tasks are warm
+    if not getattr(request.app.state, "ready", False):
+        raise ServiceUnavailableException("Starting up")
+    return {"status": "ready"}
 
-# @app.on_event("shutdown")
-# async def shutdown():
-#     await kafka_producer.stop()
-#     await kafka_consumer.stop()
+
+@app.get("/.well-known/jwks.json", include_in_schema=False)
+async def jwks(request: Request) -> Response:
+    headers = {
+        "Cache-Control": f"public, max-age={settings.JWKS_MAX_AGE_SECONDS}",
+        "ETag": key_set.jwks_etag,
+    }
+    if request.headers.get("if-none-match") == key_set.jwks_etag:
+        return Response(status_code=304, headers=headers)
+    return Response(
+        key_set.jwks_body, media_type="application/jwk-set+json", headers=headers
+    )
@@ -1 +1,3 @@
+from .outbox import OutboxEvent
+from .token import RefreshToken, RevokedToken
 from .user import User
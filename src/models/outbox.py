@@ -0,0 +1,18 @@
+from sqlalchemy import BigInteger, Column, DateTime, Identity, String, func
+from sqlalchemy.dialects.postgresql import JSONB
+
+from src.database.postgres.database import Base
+
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+
+    # Monotonic, the relay publishes in id order and deletes what it sent
+    id = Column(BigInteger, Identity(), primary_key=True)
+    topic = Column(String, nullable=False)
+    key = Column(String)
+    event_type = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
@@ -0,0 +1,36 @@
+import uuid
+
+from sqlalchemy import UUID, Column, DateTime, ForeignKey, String, func
+
+from src.database.postgres.database import Base
+
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        index=True,
+        nullable=False,
+    )
+    # SHA-256 of the token, the token itself is never stored
+    token_hash = Column(String(64), unique=True, nullable=False)
+    # Tokens rotated from the same login, revoked together on reuse
+    family_id = Column(UUID(as_uuid=True), index=True, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    used_at = Column(DateTime(timezone=True))
+    # Space separated scopes granted at login, `None` for all the user may have
+    scope = Column(String)
+
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    # A token's `jti`, or a `version_key` revoking all tokens of a user version
+    jti = Column(String, primary_key=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked_at = Column(
+        DateTime(timezone=True), server_default=func.now(), index=True, nullable=False
+    )
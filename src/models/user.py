@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import UUID, Boolean, Column, String
+from sqlalchemy import UUID, Boolean, Column, Index, Integer, String, func
 
 from src.database.postgres.database import Base
 
@@ -10,6 +10,13 @@ class User(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     full_name = Column(String, index=True)
-    email = Column(String, unique=True, index=True, nullable=False)
+    # Stored as entered, unique and looked up case-insensitively through
+    # the lower(email) index
+    email = Column(String, nullable=False)
     hashed_password = Column(String, nullable=False)
     is_superuser = Column(Boolean(), default=False)
+    # Access tokens carry the version they were issued at, bumped when the
+    # claims in them go stale
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (Index("users_email_lower_key", func.lower(email), unique=True),)
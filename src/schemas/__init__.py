@@ -1,3 +1,4 @@
-from .token import Token, TokenPayload
-from .user import (User, UserBase, UserCreate, UserInDB, UserInDBBase,
-                   UserUpdate)
+from .token import RefreshTokenRequest, Token, TokenPayload
+from .user import (Principal, User, UserBase, UserBulkCreateResult, UserCreate,
+                   UserInDB, UserInDBBase, UserUpdate, dump_user_json,
+                   dump_users_json, user_from_orm)
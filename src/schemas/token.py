@@ -1,4 +1,5 @@
 from typing import Optional
+from uuid import UUID
 
 from pydantic import BaseModel
 
@@ -6,7 +7,20 @@ from pydantic import BaseModel
 class Token(BaseModel):
     access_token: str
     token_type: str
+    expires_in: Optional[int] = None
+    refresh_token: Optional[str] = None
+    scope: Optional[str] = None
+
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenPayload(BaseModel):
-    sub: Optional[int] = None
+    sub: Optional[UUID] = None
+    exp: Optional[int] = None
+    jti: Optional[str] = None
+    # Authorization claims, see `create_access_token`
+    su: bool = False
+    scope: str = ""
+    ver: int = 0
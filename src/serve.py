@@ -0,0 +1,102 @@
+"""
+Serve the API with uvicorn, configured from `Settings`.
+
+    python -m src.serve
+
+With WEB_WORKERS above 1 uvicorn spawns the workers as fresh processes, each
+importing the app and creating its own engine, pool, caches and hashing
+pool, nothing is shared between them. A memory user cache would keep
+serving a changed row on the other workers, so it is turned off, and memory
+rate limits would allow one budget per worker, so starting refuses them: use
+Redis for both. The default SECRET_KEY is random per process, so HS256 needs
+an explicit one or tokens signed by one worker fail on the others. Sticky
+replica reads (`replica_set.stick`) are per process too, a read served by
+another worker can miss the caller's own write. Size DB_POOL_SIZE +
+DB_MAX_OVERFLOW per worker.
+"""
+import logging
+import math
+import os
+
+import uvicorn
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def available_cpus() -> int:
+    """
+    Cores this process may use, honouring the affinity mask and a cgroup v2
+    CPU quota, which `os.cpu_count` ignores inside containers.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+    except (OSError, ValueError):
+        return cpus
+    if quota == "max":
+        return cpus
+    return max(1, min(cpus, math.ceil(int(quota) / int(period))))
+
+
+def configure_workers(workers: int, cpus: int) -> None:
+    """
+    Adjust the environment the spawned workers read their settings from,
+    or exit if the settings can't work with `workers` processes.
+    """
+    if workers <= 1:
+        return
+    if settings.RATE_LIMIT_ENABLED and settings.RATE_LIMIT_BACKEND == "memory":
+        raise SystemExit(
+            f"RATE_LIMIT_BACKEND=memory would give each of the {workers} workers "
+            f"its own limits, use redis or set WEB_WORKERS=1"
+        )
+    if (
+        settings.JWT_ALGORITHM == "HS256"
+        and "SECRET_KEY" not in settings.model_fields_set
+    ):
+        raise SystemExit(
+            f"Each of the {workers} workers would sign tokens with its own random "
+            f"SECRET_KEY, set one or use WEB_WORKERS=1"
+        )
+    if settings.USER_CACHE_BACKEND == "memory":
+        if "USER_CACHE_BACKEND" in settings.model_fields_set:
+            raise SystemExit(
+                f"USER_CACHE_BACKEND=memory can't be invalidated across the "
+                f"{workers} workers, use redis or none"
+            )
+        logger.info("Turning the user cache off, memory can't be shared by workers")
+        os.environ["USER_CACHE_BACKEND"] = "none"
+    # Split the cores between the workers' hashing pools unless configured
+    if "PASSWORD_HASH_WORKERS" not in settings.model_fields_set:
+        os.environ["PASSWORD_HASH_WORKERS"] = str(max(1, cpus // workers))
+
+
+def main() -> None:
+    logging.basicConfig(
+        format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO
+    )
+    cpus = available_cpus()
+    workers = settings.WEB_WORKERS or cpus
+    configure_workers(workers, cpus)
+    uvicorn.run(
+        "src.main:app",
+        host=settings.WEB_HOST,
+        port=settings.WEB_PORT,
+        workers=workers,
+        loop=settings.WEB_LOOP,
+        http=settings.WEB_HTTP,
+        backlog=settings.WEB_BACKLOG,
+        timeout_keep_alive=settings.WEB_KEEPALIVE_SECONDS,
+        access_log=settings.WEB_ACCESS_LOG,
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
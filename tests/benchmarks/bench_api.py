@@ -0,0 +1,196 @@
+"""
+Throughput and latency of the auth API endpoints. Boots `src.main:app`
+in-process with its lifespan against the configured Postgres, seeds users
+through the CRUD layer and drives each scenario with `--concurrency` clients.
+
+    python -m tests.benchmarks.bench_api --users 1000 --save baseline.json
+    python -m tests.benchmarks.bench_api --baseline baseline.json
+
+With `--baseline` the run fails (exit status 1) when a scenario's throughput
+drops, or its p95 latency grows, by more than `--threshold`. Baselines only
+compare runs on the same machine and settings. Login rate limiting and the
+outbox relay are turned off for the run.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Sequence
+
+import httpx
+
+from src import crud, schemas
+from src.core.config import settings
+from src.database.postgres.database import AsyncSessionFactory
+from src.main import app, lifespan
+from tests.utils import random_email, random_lower_string
+
+Request = Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """
+    Nearest-rank percentile of sorted `values`, `q` between 0 and 100.
+    """
+    if not values:
+        return 0.0
+    return values[max(1, math.ceil(q / 100 * len(values))) - 1]
+
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def compare(
+    baseline: Dict[str, Any], results: Dict[str, Any], threshold: float
+) -> List[str]:
+    """
+    Regressions of `results` against `baseline`, scenarios missing from
+    either side are ignored.
+    """
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if previous is None:
+            continue
+        if current["rps"] < previous["rps"] * (1 - threshold):
+            regressions.append(
+                f"{name}: {current['rps']} req/s, baseline {previous['rps']} req/s"
+            )
+        if current["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+            regressions.append(
+                f"{name}: p95 {current['p95_ms']}ms, baseline {previous['p95_ms']}ms"
+            )
+    return regressions
+
+
+async def measure(
+    client: httpx.AsyncClient, request: Request, concurrency: int, seconds: float
+) -> Dict[str, float]:
+    latencies: List[float] = []
+    deadline = time.perf_counter() + seconds
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await request(client)
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+async def seed(users: int) -> Dict[str, Any]:
+    email, password = random_email(), random_lower_string()
+    async with AsyncSessionFactory() as session:
+        await crud.user.add(
+            session,
+            obj_in=schemas.UserCreate(
+                email=email, password=password, is_superuser=True
+            ),
+        )
+        results = await crud.user.add_many(
+            session,
+            objs_in=[
+                schemas.UserCreate(email=random_email(), password=random_lower_string())
+                for _ in range(users)
+            ],
+        )
+    return {
+        "email": email,
+        "password": password,
+        "ids": [str(result.id) for result in results if result.id is not None],
+    }
+
+
+def scenarios(data: Dict[str, Any], headers: Dict[str, str]) -> Dict[str, Request]:
+    api = settings.API_V1_STR
+    form = {"username": data["email"], "password": data["password"]}
+    ids = data["ids"]
+    # Same sequence of ids in every run
+    rng = random.Random(0)
+    return {
+        "login": lambda client: client.post(f"{api}/login", data=form),
+        "users_me": lambda client: client.get(f"{api}/users/me", headers=headers),
+        "users_by_id": lambda client: client.get(
+            f"{api}/users/{rng.choice(ids)}", headers=headers
+        ),
+        "users_list": lambda client: client.get(
+            f"{api}/users/?limit=100", headers=headers
+        ),
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    settings.RATE_LIMIT_ENABLED = False
+    settings.OUTBOX_RELAY_ENABLED = False
+    results: Dict[str, Any] = {
+        "config": {
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "seconds": args.seconds,
+        },
+        "scenarios": {},
+    }
+    async with lifespan(app):
+        data = await seed(args.users)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            response = await client.post(
+                f"{settings.API_V1_STR}/login",
+                data={"username": data["email"], "password": data["password"]},
+            )
+            response.raise_for_status()
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            for name, request in scenarios(data, headers).items():
+                if args.scenario and name not in args.scenario:
+                    continue
+                summary = await measure(client, request, args.concurrency, args.seconds)
+                results["scenarios"][name] = summary
+                print(
+                    f"{name:<12} req/s={summary['rps']:<8} p50={summary['p50_ms']}ms "
+                    f"p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms"
+                )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--scenario", action="append", help="Run only these")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Bulk user import throughput against the configured database.
+
+    python -m tests.benchmarks.bench_bulk_import --users 100000
+
+Password hashing dominates: expect roughly `users * bcrypt time / workers`
+seconds. `--hash-only` and `--insert-only` split the two phases.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from src import crud
+from src.core.hashing import hasher
+from src.database.postgres.database import AsyncSessionFactory
+from src.schemas import UserCreate
+
+
+async def run(args: argparse.Namespace) -> None:
+    prefix = uuid.uuid4().hex[:8]
+    users_in = [
+        UserCreate(email=f"bench-{prefix}-{i}@example.com", password=f"password-{i}")
+        for i in range(args.users)
+    ]
+
+    if not args.insert_only:
+        start = time.perf_counter()
+        await hasher.hash_many([u.password for u in users_in[: args.hash_sample]])
+        elapsed = time.perf_counter() - start
+        rate = args.hash_sample / elapsed
+        print(f"hashing: {rate:.1f} passwords/s on {hasher.workers} workers")
+        print(f"hashing estimate for {args.users} users: {args.users / rate:.0f}s")
+    if args.hash_only:
+        return
+
+    start = time.perf_counter()
+    async with AsyncSessionFactory() as session:
+        if args.insert_only:
+            hashed = users_in[0].password
+            hasher.hash_many = _constant_hashes(await hasher.hash(hashed))
+        results = await crud.user.add_many(
+            session, objs_in=users_in, batch_size=args.batch_size
+        )
+    elapsed = time.perf_counter() - start
+    created = sum(r.status == "created" for r in results)
+    print(f"import: {created} users in {elapsed:.1f}s ({created / elapsed:.0f}/s)")
+
+
+def _constant_hashes(hashed_password: str):
+    async def hash_many(passwords):
+        return [hashed_password] * len(passwords)
+
+    return hash_many
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--hash-sample", type=int, default=64)
+    parser.add_argument("--hash-only", action="store_true")
+    parser.add_argument("--insert-only", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Access token encode/decode throughput of `src.core.jwt_codec` against the
+python-jose implementation it replaced, per algorithm.
+
+    python -m tests.benchmarks.bench_jwt --seconds 1
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import jwt
+
+from src.core.jwt_codec import JWTCodec
+from src.core.keys import HMACKey, JWTKey
+
+SECRET = "secret"
+
+
+def ops_per_second(func: Callable[[], object], seconds: float) -> float:
+    count, start = 0, time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            func()
+        count += 100
+    return count / (time.perf_counter() - start)
+
+
+def _pems(algorithm: str):
+    if algorithm == "RS256":
+        private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        private = ec.generate_private_key(ec.SECP256R1())
+    private_pem = private.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    public_pem = (
+        private.public_key()
+        .public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        .decode()
+    )
+    return private_pem, public_pem
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    claims = {
+        "sub": "0b8e3a4e-64b5-4a59-9a86-1dbd6bd42f3a",
+        "exp": datetime.utcnow() + timedelta(minutes=15),
+    }
+    codec = JWTCodec()
+    for algorithm in ("HS256", "RS256", "ES256"):
+        if algorithm == "HS256":
+            jose_sign = jose_verify = SECRET
+            key = HMACKey(SECRET)
+        else:
+            jose_sign, jose_verify = _pems(algorithm)
+            key = JWTKey.from_pem(jose_sign)
+
+        def get_key(kid):
+            return key
+
+        jose_token = jwt.encode(claims, jose_sign, algorithm=algorithm)
+        token = codec.encode(claims, key)
+        results = {
+            "jose encode": ops_per_second(
+                lambda: jwt.encode(claims, jose_sign, algorithm=algorithm),
+                args.seconds,
+            ),
+            "codec encode": ops_per_second(
+                lambda: codec.encode(claims, key), args.seconds
+            ),
+            "jose decode": ops_per_second(
+                lambda: jwt.decode(jose_token, jose_verify, algorithms=[algorithm]),
+                args.seconds,
+            ),
+            "codec decode": ops_per_second(
+                lambda: codec.decode(token, get_key), args.seconds
+            ),
+        }
+        for name, ops in results.items():
+            print(f"{algorithm:<6} {name:<13} ops/s={ops:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
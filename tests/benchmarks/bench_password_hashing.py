@@ -0,0 +1,45 @@
+"""
+Concurrent login throughput of the password hasher for an increasing number of
+workers. bcrypt releases the GIL, so throughput should scale with cores until
+the worker count exceeds `os.cpu_count()`.
+
+    python -m tests.benchmarks.bench_password_hashing --requests 64
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from src.core.hashing import PasswordHasher
+from src.core.security import get_password_hash
+
+
+async def run(workers: int, requests: int, hashed_password: str) -> float:
+    hasher = PasswordHasher(workers=workers, max_pending=requests)
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(hasher.verify("password", hashed_password) for _ in range(requests))
+    )
+    elapsed = time.perf_counter() - start
+    hasher.shutdown()
+    return requests / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    hashed_password = get_password_hash("password")
+    workers = 1
+    while True:
+        throughput = asyncio.run(run(workers, args.requests, hashed_password))
+        print(f"workers={workers:<3} logins/s={throughput:.1f}")
+        if workers >= args.max_workers:
+            break
+        workers = min(workers * 2, args.max_workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Requests per second of `GET /users/me` and `GET /users/` served in-process
+through the ASGI app, so the numbers reflect validation and serialization
+cost rather than network overhead. Needs the test database.
+
+    python -m tests.benchmarks.bench_users_api --users 100 --seconds 3
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from src.core.config import settings
+from tests.utils import random_email, random_lower_string
+
+
+async def measure(
+    client: httpx.AsyncClient, url: str, headers, seconds: float
+) -> float:
+    count, start = 0, time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        response = await client.get(url, headers=headers)
+        response.raise_for_status()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+async def run(users: int, seconds: float) -> None:
+    from src import crud, schemas
+    from src.database.postgres.database import AsyncSessionFactory, init_tables
+    from src.main import app
+
+    await init_tables()
+    email, password = random_email(), random_lower_string()
+    async with AsyncSessionFactory() as session:
+        await crud.user.add(
+            session,
+            obj_in=schemas.UserCreate(
+                email=email, password=password, is_superuser=True
+            ),
+        )
+        await crud.user.add_many(
+            session,
+            objs_in=[
+                schemas.UserCreate(email=random_email(), password=random_lower_string())
+                for _ in range(users)
+            ],
+        )
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        response = await client.post(
+            f"{settings.API_V1_STR}/login",
+            data={"username": email, "password": password},
+        )
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        for name, url in (
+            ("/users/me", f"{settings.API_V1_STR}/users/me"),
+            (f"/users/?limit={users}", f"{settings.API_V1_STR}/users/?limit={users}"),
+        ):
+            throughput = await measure(client, url, headers, seconds)
+            print(f"{name:<22} req/s={throughput:.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.users, args.seconds))
+
+
+if __name__ == "__main__":
+    main()
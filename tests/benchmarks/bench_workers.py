@@ -0,0 +1,121 @@
+"""
+Throughput of `POST /login` and `GET /users/me` served by `python -m
+src.serve` with one and with several workers, over real HTTP connections.
+Needs the test database and uvicorn. Rate limiting, the outbox relay and the
+access log are turned off in the server so only request handling is measured.
+
+    python -m tests.benchmarks.bench_workers --workers 1 4 --concurrency 64
+
+Password hashing already runs on every core from a single worker, so login
+gains less from more workers than `/users/me`, whose token decoding and
+serialization run on the event loop.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from typing import Awaitable, Callable
+
+import httpx
+
+from src.core.config import settings
+from tests.utils import random_email, random_lower_string
+
+
+async def create_user(email: str, password: str) -> None:
+    from src import crud, schemas
+    from src.database.postgres.database import AsyncSessionFactory, init_tables
+
+    await init_tables()
+    async with AsyncSessionFactory() as session:
+        await crud.user.add(
+            session, obj_in=schemas.UserCreate(email=email, password=password)
+        )
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "WEB_WORKERS": str(workers),
+        "WEB_PORT": str(port),
+        "WEB_ACCESS_LOG": "false",
+        "RATE_LIMIT_ENABLED": "false",
+        "OUTBOX_RELAY_ENABLED": "false",
+    }
+    return subprocess.Popen([sys.executable, "-m", "src.serve"], env=env)
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not become ready")
+
+
+async def measure(
+    request: Callable[[], Awaitable[httpx.Response]], concurrency: int, seconds: float
+) -> float:
+    count = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker() -> None:
+        nonlocal count
+        while time.perf_counter() < deadline:
+            (await request()).raise_for_status()
+            count += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return count / (time.perf_counter() - start)
+
+
+async def run(workers: int, port: int, concurrency: int, seconds: float) -> None:
+    email, password = random_email(), random_lower_string()
+    await create_user(email, password)
+    server = start_server(workers, port)
+    limits = httpx.Limits(max_connections=concurrency)
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60
+        ) as client:
+            await wait_ready(client)
+            form = {"username": email, "password": password}
+            login_url = f"{settings.API_V1_STR}/login"
+            response = await client.post(login_url, data=form)
+            response.raise_for_status()
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            login = await measure(
+                lambda: client.post(login_url, data=form), concurrency, seconds
+            )
+            me = await measure(
+                lambda: client.get(f"{settings.API_V1_STR}/users/me", headers=headers),
+                concurrency,
+                seconds,
+            )
+            print(f"workers={workers:<3} login req/s={login:<8.0f} me req/s={me:.0f}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count()])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+    for workers in args.workers:
+        asyncio.run(run(workers, args.port, args.concurrency, args.seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+from tests.benchmarks.bench_api import compare, percentile, summarize
+
+
+def test_percentile_is_nearest_rank():
+    values = [float(value) for value in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 100) == 100
+    assert percentile([7.0], 99) == 7
+    assert percentile([], 50) == 0
+
+
+def test_summarize():
+    summary = summarize([0.002, 0.001, 0.003, 0.004], elapsed=2)
+    assert summary == {
+        "requests": 4,
+        "rps": 2.0,
+        "p50_ms": 2.0,
+        "p95_ms": 4.0,
+        "p99_ms": 4.0,
+    }
+
+
+def test_compare_reports_regressions_beyond_threshold():
+    baseline = {
+        "scenarios": {
+            "login": {"rps": 100, "p95_ms": 10},
+            "users_me": {"rps": 1000, "p95_ms": 2},
+        }
+    }
+    results = {
+        "scenarios": {
+            "login": {"rps": 95, "p95_ms": 10.5},
+            "users_me": {"rps": 800, "p95_ms": 3},
+            "users_list": {"rps": 1, "p95_ms": 100},
+        }
+    }
+    regressions = compare(baseline, results, threshold=0.1)
+    assert len(regressions) == 2
+    assert all(regression.startswith("users_me") for regression in regressions)
@@ -1,8 +1,10 @@
 from fastapi import HTTPException
 from starlette import status
 
-from src.core.exceptions import (DuplicatedEntryError, ForbiddenException,
-                                 NotFoundException)
+from src.core.exceptions import (BadRequestException, DuplicatedEntryError,
+                                 ForbiddenException, NotFoundException,
+                                 ServiceUnavailableException,
+                                 TooManyRequestsException)
 
 
 def test_duplicated_entry_error():
@@ -30,3 +32,32 @@ def test_not_found_exception():
     except HTTPException as exc:
         assert exc.status_code == status.HTTP_404_NOT_FOUND
         assert exc.detail == message
+
+
+def test_service_unavailable_exception():
+    message = "Try again later."
+    try:
+        raise ServiceUnavailableException(message)
+    except HTTPException as exc:
+        assert exc.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert exc.detail == message
+        assert exc.headers["Retry-After"]
+
+
+def test_bad_request_exception():
+    message = "Invalid input."
+    try:
+        raise BadRequestException(message)
+    except HTTPException as exc:
+        assert exc.status_code == status.HTTP_400_BAD_REQUEST
+        assert exc.detail == message
+
+
+def test_too_many_requests_exception():
+    message = "Slow down."
+    try:
+        raise TooManyRequestsException(message, retry_after=2.5)
+    except HTTPException as exc:
+        assert exc.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert exc.detail == message
+        assert exc.headers["Retry-After"] == "3"
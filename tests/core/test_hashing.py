@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette import status
+
+from src.core.hashing import PasswordHasher
+from src.core.security import verify_password
+from tests.utils import random_lower_string
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify():
+    hasher = PasswordHasher(workers=2, max_pending=4)
+    plain_password = random_lower_string()
+    hashed_password = await hasher.hash(plain_password)
+    assert verify_password(plain_password, hashed_password)
+    assert await hasher.verify(plain_password, hashed_password) is True
+    assert await hasher.verify("wrong_password", hashed_password) is False
+    assert hasher.pending == 0
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_queue_is_full():
+    hasher = PasswordHasher(workers=1, max_pending=2)
+    tasks = [asyncio.create_task(hasher.hash(random_lower_string())) for _ in range(3)]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    rejected = [r for r in results if isinstance(r, HTTPException)]
+    assert len(rejected) == 1
+    assert rejected[0].status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert hasher.pending == 0
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hash_many_keeps_order():
+    hasher = PasswordHasher(workers=2, max_pending=1)
+    passwords = [random_lower_string() for _ in range(3)]
+    hashed = await hasher.hash_many(passwords)
+    assert [verify_password(p, h) for p, h in zip(passwords, hashed)] == [True] * 3
+    assert hasher.pending == 0
+    hasher.shutdown()
+
+
+async def test_verify_dummy_never_matches():
+    hasher = PasswordHasher(workers=1, max_pending=4)
+    assert await hasher.verify_dummy(random_lower_string()) is False
+    assert await hasher.verify_dummy(random_lower_string()) is False
+    hasher.shutdown()
@@ -0,0 +1,46 @@
+import pytest
+from sqlalchemy import text
+
+from src.core.instrumentation import (REQUEST_DB_STATEMENTS, REQUESTS,
+                                      QueryStatsMiddleware, RequestStats,
+                                      current_stats)
+from src.database.postgres.database import engine
+
+
+@pytest.mark.asyncio
+async def test_engine_events_record_statements():
+    stats = RequestStats()
+    token = current_stats.set(stats)
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            await conn.execute(text("SELECT 2"))
+    finally:
+        current_stats.reset(token)
+    assert stats.statements == 2
+    assert stats.db_seconds > 0
+
+
+@pytest.mark.asyncio
+async def test_middleware_adds_server_timing_and_route_metrics():
+    async def endpoint_app(scope, receive, send):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    middleware = QueryStatsMiddleware(endpoint_app)
+    await middleware({"type": "http", "method": "GET"}, receive, send)
+
+    headers = dict(messages[0]["headers"])
+    assert b'desc="1 queries"' in headers[b"server-timing"]
+    assert REQUESTS.labels("GET", "unmatched", "200").value >= 1
+    assert REQUEST_DB_STATEMENTS.labels("GET", "unmatched").sum >= 1
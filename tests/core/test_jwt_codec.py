@@ -0,0 +1,89 @@
+import base64
+import json
+import time
+
+import pytest
+
+from src.core.jwt_codec import (ExpiredSignatureError, JWTClaimsError,
+                                JWTCodec, JWTError)
+from src.core.keys import HMACKey
+
+KEY = HMACKey("secret")
+
+
+def _get_key(kid):
+    return KEY if kid is None else None
+
+
+def _claims(**claims) -> dict:
+    return {"sub": "user", "exp": int(time.time()) + 60, **claims}
+
+
+def test_roundtrip():
+    codec = JWTCodec(issuer="auth", audience="api")
+    claims = codec.decode(codec.encode(_claims(), KEY), _get_key)
+    assert claims["sub"] == "user"
+    assert claims["iss"] == "auth"
+    assert claims["aud"] == "api"
+    assert claims["iat"] <= time.time()
+
+
+def test_rejects_tampered_token():
+    codec = JWTCodec()
+    header, payload, signature = codec.encode(_claims(), KEY).split(".")
+    other_payload = codec.encode(_claims(sub="admin"), KEY).split(".")[1]
+    with pytest.raises(JWTError):
+        codec.decode(".".join([header, other_payload, signature]), _get_key)
+    with pytest.raises(JWTError):
+        codec.decode(codec.encode(_claims(), HMACKey("other")), _get_key)
+
+
+@pytest.mark.parametrize("token", ["", "a.b", "a.b.c.d", "!!.??.**", "é.é.é"])
+def test_rejects_malformed_token(token):
+    with pytest.raises(JWTError):
+        JWTCodec().decode(token, _get_key)
+
+
+@pytest.mark.parametrize(
+    "header", [{"alg": "HS256", "kid": []}, {"alg": "HS256", "kid": {}}, {"alg": 1}]
+)
+def test_rejects_malformed_header(header):
+    codec = JWTCodec()
+    _, payload, signature = codec.encode(_claims(), KEY).split(".")
+    segment = base64.urlsafe_b64encode(json.dumps(header).encode()).rstrip(b"=")
+    token = ".".join([segment.decode(), payload, signature])
+    with pytest.raises(JWTError):
+        codec.decode(token, {None: KEY}.get)
+
+
+def test_requires_exp():
+    codec = JWTCodec()
+    with pytest.raises(JWTClaimsError):
+        codec.decode(codec.encode({"sub": "user"}, KEY), _get_key)
+    with pytest.raises(ExpiredSignatureError):
+        codec.decode(codec.encode(_claims(exp=time.time() - 1), KEY), _get_key)
+
+
+def test_leeway():
+    codec = JWTCodec(leeway=30)
+    token = codec.encode(_claims(exp=int(time.time()) - 10), KEY)
+    assert codec.decode(token, _get_key)["sub"] == "user"
+
+
+def test_rejects_future_nbf_and_iat():
+    codec = JWTCodec()
+    future = int(time.time()) + 60
+    with pytest.raises(JWTClaimsError):
+        codec.decode(codec.encode(_claims(nbf=future), KEY), _get_key)
+    with pytest.raises(JWTClaimsError):
+        codec.decode(codec.encode(_claims(iat=future), KEY), _get_key)
+
+
+def test_checks_issuer_and_audience():
+    token = JWTCodec(issuer="other", audience="web").encode(_claims(), KEY)
+    with pytest.raises(JWTClaimsError):
+        JWTCodec(issuer="auth").decode(token, _get_key)
+    with pytest.raises(JWTClaimsError):
+        JWTCodec(audience="api").decode(token, _get_key)
+    multi = JWTCodec().encode(_claims(aud=["web", "api"]), KEY)
+    assert JWTCodec(audience="api").decode(multi, _get_key)["sub"] == "user"
@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+from src.core.jwks import JWKSVerifier
+from src.core.jwt_codec import JWTError, codec
+from src.core.keys import HMACKey, JWTKey, KeySet
+
+
+def _private_pem(algorithm: str) -> bytes:
+    if algorithm == "RS256":
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm == "ES256":
+        key = ec.generate_private_key(ec.SECP256R1())
+    else:
+        key = ed25519.Ed25519PrivateKey.generate()
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+
+
+def _public_pem(private_pem: bytes) -> bytes:
+    key = serialization.load_pem_private_key(private_pem, password=None)
+    return key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+
+
+def _claims() -> dict:
+    return {"sub": "user", "exp": datetime.utcnow() + timedelta(minutes=5)}
+
+
+@pytest.mark.parametrize("algorithm", ["RS256", "ES256", "EdDSA"])
+def test_sign_and_verify(algorithm):
+    key = JWTKey.from_pem(_private_pem(algorithm))
+    keys = KeySet(algorithm, signing_key=key)
+    token = keys.encode(_claims())
+    assert codec.get_unverified_header(token) == {
+        "alg": algorithm,
+        "kid": key.kid,
+        "typ": "JWT",
+    }
+    assert keys.decode(token)["sub"] == "user"
+
+
+def test_public_key_has_same_kid():
+    private_pem = _private_pem("RS256")
+    assert (
+        JWTKey.from_pem(private_pem).kid
+        == JWTKey.from_pem(_public_pem(private_pem)).kid
+    )
+
+
+def test_jwks_exposes_public_keys_only():
+    current, previous = _private_pem("ES256"), _private_pem("ES256")
+    keys = KeySet(
+        "ES256",
+        signing_key=JWTKey.from_pem(current),
+        verification_keys=[JWTKey.from_pem(_public_pem(previous))],
+    )
+    published = keys.jwks()["keys"]
+    assert len(published) == 2
+    assert all("d" not in key for key in published)
+    assert {key["kid"] for key in published} == {
+        JWTKey.from_pem(current).kid,
+        JWTKey.from_pem(previous).kid,
+    }
+
+
+def test_rotation_overlap():
+    old, new = _private_pem("RS256"), _private_pem("RS256")
+    token = KeySet("RS256", signing_key=JWTKey.from_pem(old)).encode(_claims())
+
+    rotated = KeySet(
+        "RS256",
+        signing_key=JWTKey.from_pem(new),
+        verification_keys=[JWTKey.from_pem(_public_pem(old))],
+    )
+    assert rotated.decode(token)["sub"] == "user"
+
+    retired = KeySet("RS256", signing_key=JWTKey.from_pem(new))
+    with pytest.raises(JWTError):
+        retired.decode(token)
+
+
+def test_rejects_other_algorithm():
+    keys = KeySet("RS256", signing_key=JWTKey.from_pem(_private_pem("RS256")))
+    hmac_key = HMACKey("secret")
+    hmac_key.kid = keys.signing_key.kid
+    forged = codec.encode(_claims(), hmac_key)
+    with pytest.raises(JWTError):
+        keys.decode(forged)
+
+
+def test_requires_private_key():
+    public_pem = _public_pem(_private_pem("ES256"))
+    with pytest.raises(ValueError):
+        KeySet("ES256", signing_key=JWTKey.from_pem(public_pem))
+
+
+async def test_jwks_verifier():
+    keys = KeySet("ES256", signing_key=JWTKey.from_pem(_private_pem("ES256")))
+    verifier = JWKSVerifier(jwks=keys.jwks())
+    assert (await verifier.verify(keys.encode(_claims())))["sub"] == "user"
+
+    other = KeySet("ES256", signing_key=JWTKey.from_pem(_private_pem("ES256")))
+    with pytest.raises(JWTError):
+        await verifier.verify(other.encode(_claims()))
+
+
+async def test_jwks_verifier_keeps_keys_when_fetch_fails(monkeypatch):
+    keys = KeySet("ES256", signing_key=JWTKey.from_pem(_private_pem("ES256")))
+    verifier = JWKSVerifier(
+        "http://127.0.0.1:1/jwks.json", jwks=keys.jwks(), ttl=0, timeout=1
+    )
+    fetches = []
+    fetch = verifier._fetch
+    monkeypatch.setattr(verifier, "_fetch", lambda: fetches.append(1) or fetch())
+    verifier._attempted_at = float("-inf")
+
+    for _ in range(3):
+        assert (await verifier.verify(keys.encode(_claims())))["sub"] == "user"
+    other = KeySet("ES256", signing_key=JWTKey.from_pem(_private_pem("ES256")))
+    with pytest.raises(JWTError):
+        await verifier.verify(other.encode(_claims()))
+    # Backs off after the failed fetch
+    assert len(fetches) == 1
+
+
+@pytest.mark.parametrize("algorithm", ["RS256", "ES256", "EdDSA"])
+def test_key_from_jwk(algorithm):
+    key = JWTKey.from_pem(_private_pem(algorithm))
+    public = JWTKey.from_jwk(key.public_jwk)
+    assert public.kid == key.kid
+    assert not public.can_sign
+    assert public.verify(key.sign(b"message"), b"message")
+    assert not public.verify(key.sign(b"message"), b"other")
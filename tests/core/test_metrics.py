@@ -0,0 +1,35 @@
+from src.core.metrics import Histogram, Registry
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(buckets=(1, 5))
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value)
+    assert histogram.count == 4
+    assert histogram.sum == 14.5
+    assert histogram.cumulative() == [("1", 2), ("5", 3), ("+Inf", 4)]
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    counter = registry.counter("logins", "Logins", ("result",))
+    counter.labels("success").inc()
+    counter.labels("success").inc()
+    registry.gauge("pending", "Pending", lambda: 3)
+    registry.callback_counter("hits", "Hits", lambda: {("a",): 1.5}, ("cache",))
+    histogram = registry.histogram("latency", "Latency", buckets=(1,))
+    histogram.observe(0.5)
+    lines = registry.render().splitlines()
+    assert "# TYPE logins counter" in lines
+    assert 'logins_total{result="success"} 2' in lines
+    assert "pending 3" in lines
+    assert 'hits_total{cache="a"} 1.5' in lines
+    assert 'latency_bucket{le="1"} 1' in lines
+    assert 'latency_bucket{le="+Inf"} 1' in lines
+    assert "latency_count 1" in lines
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    registry.counter("requests", "Requests", ("route",)).labels('/a"b').inc()
+    assert 'requests_total{route="/a\\"b"} 1' in registry.render()
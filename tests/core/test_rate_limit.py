@@ -0,0 +1,52 @@
+import time
+
+from src.core.rate_limit import (InMemoryRateLimitBackend, RateLimitBackend,
+                                 SlidingWindowLimiter)
+
+
+async def test_backend_rolls_windows():
+    backend = InMemoryRateLimitBackend()
+    assert await backend.incr("key", 10, 20) == (1, 0)
+    assert await backend.incr("key", 10, 20) == (2, 0)
+    assert await backend.incr("key", 11, 20) == (1, 2)
+    assert await backend.incr("key", 13, 20) == (1, 0)
+
+
+async def test_backend_evicts_least_recently_used():
+    backend = InMemoryRateLimitBackend(maxsize=2)
+    for key in ("a", "b", "a", "c"):
+        await backend.incr(key, 1, 2)
+    assert len(backend) == 2
+    assert await backend.incr("a", 1, 2) == (3, 0)
+    assert await backend.incr("b", 1, 2) == (1, 0)
+
+
+async def test_limiter_rejects_over_limit():
+    limiter = SlidingWindowLimiter(
+        InMemoryRateLimitBackend(), name="test", limit=3, window=3600
+    )
+    assert [await limiter.hit("client") for _ in range(3)] == [0, 0, 0]
+    assert 0 < await limiter.hit("client") <= 3600
+    assert await limiter.hit("other") == 0
+
+
+async def test_limiter_weights_previous_window(monkeypatch):
+    limiter = SlidingWindowLimiter(
+        InMemoryRateLimitBackend(), name="test", limit=4, window=100
+    )
+    monkeypatch.setattr(time, "time", lambda: 1090.0)
+    for _ in range(4):
+        assert await limiter.hit("client") == 0
+    # 25% into the next window, 75% of the previous four hits still count
+    monkeypatch.setattr(time, "time", lambda: 1125.0)
+    assert await limiter.hit("client") == 0
+    assert await limiter.hit("client") > 0
+
+
+async def test_limiter_fails_open():
+    class BrokenBackend(RateLimitBackend):
+        async def incr(self, key, window, ttl):
+            raise OSError("connection refused")
+
+    limiter = SlidingWindowLimiter(BrokenBackend(), name="test", limit=0, window=60)
+    assert await limiter.hit("client") == 0
@@ -0,0 +1,34 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from src.core.revocation import RevocationList
+from tests.utils import random_lower_string
+
+
+def test_contains_revoked_token():
+    revocations = RevocationList()
+    jti = random_lower_string()
+    revocations.add(jti, time.time() + 60)
+    assert jti in revocations
+    assert random_lower_string() not in revocations
+    assert None not in revocations
+
+
+def test_drops_expired_tokens():
+    revocations = RevocationList()
+    jti = random_lower_string()
+    revocations.add(jti, time.time() + 0.01)
+    revocations.add(random_lower_string(), time.time() - 1)
+    assert len(revocations) == 1
+    time.sleep(0.02)
+    assert jti not in revocations
+    assert len(revocations) == 0
+
+
+def test_update_tracks_newest_revocation():
+    revocations = RevocationList()
+    now = datetime.now(timezone.utc)
+    expires = now + timedelta(minutes=5)
+    revocations.update([("a", expires, now), ("b", expires, now - timedelta(1))])
+    assert "a" in revocations and "b" in revocations
+    assert revocations.synced_until == now
@@ -2,7 +2,11 @@ from datetime import timedelta
 
 import bcrypt
 
+from src.core.calibrate import calibrate_bcrypt
+from src.core.config import settings
+from src.core.keys import key_set
 from src.core.security import (create_access_token, get_password_hash,
+                               grant_scopes, password_needs_rehash,
                                verify_password)
 from tests.utils import random_lower_string
 
@@ -20,6 +24,23 @@ def test_create_access_token_without_expiration():
     assert isinstance(access_token, str)
 
 
+def test_create_access_token_embeds_claims():
+    access_token = create_access_token(
+        "user", is_superuser=True, scopes=["me", "users"], version=3
+    )
+    payload = key_set.decode(access_token)
+    assert payload["su"] is True
+    assert payload["scope"] == "me users"
+    assert payload["ver"] == 3
+
+
+def test_grant_scopes():
+    assert grant_scopes([], is_superuser=False) == ["me"]
+    assert grant_scopes([], is_superuser=True) == ["me", "users"]
+    assert grant_scopes(["users", "me"], is_superuser=False) == ["me"]
+    assert grant_scopes(["users", "unknown"], is_superuser=True) == ["users"]
+
+
 def test_verify_password_with_correct_password():
     plain_password = random_lower_string()
     hashed_password = get_password_hash(plain_password)
@@ -46,3 +67,30 @@ def test_get_password_hash_returns_different_hashes():
     hashed_password1 = get_password_hash(plain_password)
     hashed_password2 = get_password_hash(plain_password)
     assert hashed_password1 != hashed_password2
+
+
+def test_password_needs_rehash_when_rounds_change(monkeypatch):
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+    hashed_password = get_password_hash(random_lower_string())
+    assert hashed_password.startswith("$2b$04$")
+    assert password_needs_rehash(hashed_password) is False
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 5)
+    assert password_needs_rehash(hashed_password) is True
+
+
+def test_argon2id_hashes_and_upgrades_bcrypt(monkeypatch):
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+    plain_password = random_lower_string()
+    bcrypt_hash = get_password_hash(plain_password)
+    monkeypatch.setattr(settings, "PASSWORD_HASH_SCHEME", "argon2id")
+    monkeypatch.setattr(settings, "ARGON2_MEMORY_COST", 1024)
+    argon2_hash = get_password_hash(plain_password)
+    assert argon2_hash.startswith("$argon2id$")
+    assert verify_password(plain_password, argon2_hash) is True
+    assert verify_password("wrong_password", argon2_hash) is False
+    assert verify_password(plain_password, bcrypt_hash) is True
+    assert password_needs_rehash(bcrypt_hash) is True
+
+
+def test_calibrate_bcrypt_returns_minimum_cost_for_tiny_target():
+    assert calibrate_bcrypt(0) == 4
@@ -0,0 +1,60 @@
+import time
+import uuid
+
+from src.core.token_cache import TokenCache
+from src.schemas import Principal, TokenPayload
+from tests.utils import random_lower_string
+
+
+def _user() -> Principal:
+    return Principal(uuid.uuid4(), False)
+
+
+def test_get_returns_cached_entry():
+    cache = TokenCache(maxsize=10, ttl=60)
+    token, user = random_lower_string(), _user()
+    payload = TokenPayload(sub=user.id)
+    cache.set(token, payload, user, exp=None)
+    entry = cache.get(token)
+    assert entry.principal == user
+    assert entry.payload == payload
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 0}
+
+
+def test_miss_on_unknown_token():
+    cache = TokenCache(maxsize=10, ttl=60)
+    assert cache.get(random_lower_string()) is None
+    assert cache.misses == 1
+
+
+def test_entry_expires_with_token():
+    cache = TokenCache(maxsize=10, ttl=60)
+    token = random_lower_string()
+    cache.set(token, None, _user(), exp=time.time() - 1)
+    assert cache.get(token) is None
+    assert len(cache) == 0
+
+
+def test_evicts_least_recently_used():
+    cache = TokenCache(maxsize=2, ttl=60)
+    tokens = [random_lower_string() for _ in range(3)]
+    cache.set(tokens[0], None, _user(), exp=None)
+    cache.set(tokens[1], None, _user(), exp=None)
+    cache.get(tokens[0])
+    cache.set(tokens[2], None, _user(), exp=None)
+    assert cache.get(tokens[1]) is None
+    assert cache.get(tokens[0]) is not None
+    assert cache.get(tokens[2]) is not None
+
+
+def test_invalidate_user_drops_all_tokens():
+    cache = TokenCache(maxsize=10, ttl=60)
+    user, other = _user(), _user()
+    tokens = [random_lower_string() for _ in range(2)]
+    for token in tokens:
+        cache.set(token, None, user, exp=None)
+    other_token = random_lower_string()
+    cache.set(other_token, None, other, exp=None)
+    cache.invalidate_user(user.id)
+    assert all(cache.get(token) is None for token in tokens)
+    assert cache.get(other_token) is not None
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import crud
+from src.crud.cache import (InMemoryCacheBackend, ModelCache, encode_command,
+                            read_reply)
+from src.schemas import UserCreate, UserUpdate
+from tests.utils import random_email, random_lower_string
+
+
+def _cache() -> ModelCache:
+    return ModelCache(InMemoryCacheBackend(), namespace="test", ttl=60, negative_ttl=1)
+
+
+@pytest.mark.asyncio
+async def test_in_memory_backend_expires_entries():
+    backend = InMemoryCacheBackend()
+    await backend.set("key", b"value", ttl=60)
+    assert await backend.get("key") == b"value"
+    await backend.set("key", b"value", ttl=0)
+    assert await backend.get("key") is None
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_calls_loader_once_for_concurrent_misses():
+    cache = _cache()
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"value": calls}
+
+    results = await asyncio.gather(*(cache.get_or_load("key", load) for _ in range(5)))
+    assert calls == 1
+    assert results == [{"value": 1}] * 5
+    assert await cache.get_or_load("key", load) == {"value": 1}
+    assert cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_caches_missing_values():
+    cache = _cache()
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        return None
+
+    assert await cache.get_or_load("key", load) is None
+    assert await cache.get_or_load("key", load) is None
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_during_load_skips_stale_value():
+    cache = _cache()
+
+    async def load():
+        await cache.invalidate("key")
+        return "stale"
+
+    assert await cache.get_or_load("key", load) == "stale"
+    assert await cache.backend.get("key") is None
+
+
+@pytest.mark.asyncio
+async def test_redis_protocol_roundtrip():
+    assert encode_command("SET", "key", b"v") == (
+        b"*3\r\n$3\r\nSET\r\n$3\r\nkey\r\n$1\r\nv\r\n"
+    )
+    reader = asyncio.StreamReader()
+    reader.feed_data(b"+OK\r\n$5\r\nhello\r\n$-1\r\n:2\r\n")
+    assert await read_reply(reader) == b"OK"
+    assert await read_reply(reader) == b"hello"
+    assert await read_reply(reader) is None
+    assert await read_reply(reader) == 2
+
+
+@pytest.mark.asyncio
+async def test_get_by_email_after_email_change(db: AsyncSession):
+    email, new_email = random_email(), random_email()
+    user_in = UserCreate(email=email, password=random_lower_string())
+    user = await crud.user.add(db, obj_in=user_in)
+    assert (await crud.user.get_by_email(db, email=email)).id == user.id
+    await crud.user.update(db, id_=user.id, obj_in=UserUpdate(email=new_email))
+    assert await crud.user.get_by_email(db, email=email) is None
+    assert (await crud.user.get_by_email(db, email=new_email)).id == user.id
@@ -0,0 +1,46 @@
+import json
+from typing import Any, List
+
+import pytest
+from sqlalchemy import Select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import crud
+
+
+async def _plan_indexes(db: AsyncSession, query: Select) -> List[str]:
+    sql = query.compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    )
+    # The test table is too small for the planner to prefer an index on its
+    # own, this checks that the query is able to use one
+    await db.execute(text("SET LOCAL enable_seqscan = off"))
+    result = await db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+    plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    await db.rollback()
+
+    indexes = []
+
+    def walk(node: Any) -> None:
+        if "Index Name" in node:
+            indexes.append(node["Index Name"])
+        for child in node.get("Plans", ()):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return indexes
+
+
+@pytest.mark.asyncio
+async def test_login_lookup_uses_lower_email_index(db: AsyncSession) -> None:
+    query = crud.user._email_query("Someone@Example.com")
+    assert await _plan_indexes(db, query) == ["users_email_lower_key"]
+
+
+@pytest.mark.asyncio
+async def test_duplicate_check_uses_lower_email_index(db: AsyncSession) -> None:
+    query = crud.user._existing_emails_query(["A@example.com", "b@example.com"])
+    assert await _plan_indexes(db, query) == ["users_email_lower_key"]
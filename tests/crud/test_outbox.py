@@ -0,0 +1,68 @@
+import uuid
+from typing import List
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import crud
+from src.core.exceptions import DuplicatedEntryError
+from src.models import OutboxEvent
+from src.schemas import UserCreate, UserUpdate
+from tests.utils import random_email, random_lower_string
+
+
+async def _events(db: AsyncSession, user_id: uuid.UUID) -> List[OutboxEvent]:
+    query = (
+        select(OutboxEvent)
+        .where(OutboxEvent.key == str(user_id))
+        .order_by(OutboxEvent.id)
+    )
+    return list((await db.execute(query)).scalars().all())
+
+
+@pytest.mark.asyncio
+async def test_user_changes_write_outbox_events(db: AsyncSession) -> None:
+    user_in = UserCreate(email=random_email(), password=random_lower_string())
+    user = await crud.user.add(db, obj_in=user_in)
+    full_name = random_lower_string()
+    await crud.user.update(db, id_=user.id, obj_in=UserUpdate(full_name=full_name))
+    await crud.user.update(
+        db, id_=user.id, obj_in=UserUpdate(password=random_lower_string())
+    )
+
+    events = await _events(db, user.id)
+    assert [event.event_type for event in events] == [
+        "user.created",
+        "user.updated",
+        "user.password_changed",
+    ]
+    assert {event.topic for event in events} == {"user-events"}
+    assert events[0].payload["email"] == user_in.email
+    assert events[1].payload["full_name"] == full_name
+    assert all("hashed_password" not in event.payload for event in events)
+
+
+@pytest.mark.asyncio
+async def test_failed_add_writes_no_event(db: AsyncSession) -> None:
+    user_in = UserCreate(email=random_email(), password=random_lower_string())
+    user_id = (await crud.user.add(db, obj_in=user_in)).id
+    with pytest.raises(DuplicatedEntryError):
+        await crud.user.add(db, obj_in=user_in)
+    assert len(await _events(db, user_id)) == 1
+
+
+@pytest.mark.asyncio
+async def test_add_many_writes_an_event_per_created_user(db: AsyncSession) -> None:
+    email = random_email()
+    await crud.user.add(db, obj_in=UserCreate(email=email, password="password"))
+    results = await crud.user.add_many(
+        db,
+        objs_in=[
+            UserCreate(email=email, password="password"),
+            UserCreate(email=random_email(), password="password"),
+        ],
+    )
+    assert [result.status for result in results] == ["duplicate", "created"]
+    events = await _events(db, results[1].id)
+    assert [event.event_type for event in events] == ["user.created"]
@@ -0,0 +1,76 @@
+import uuid
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import crud
+from src.crud.pagination import decode_cursor, encode_cursor
+from src.models import User
+from src.schemas import UserCreate
+from tests.utils import random_email, random_lower_string
+
+
+async def _create_users(db: AsyncSession, full_name: str, count: int) -> list:
+    users = []
+    for _ in range(count):
+        user_in = UserCreate(
+            email=random_email(), password=random_lower_string(), full_name=full_name
+        )
+        users.append(await crud.user.add(db, obj_in=user_in))
+    return users
+
+
+def test_cursor_roundtrip():
+    user = User(id=uuid.uuid4(), email=random_email())
+    cursor = encode_cursor([user.email, user.id])
+    assert decode_cursor(cursor, [User.email, User.id]) == [user.email, user.id]
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor",
+        encode_cursor([1, 2]),
+        encode_cursor([5]),
+        encode_cursor([None]),
+        encode_cursor(["not a uuid"]),
+    ],
+)
+def test_decode_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, [User.id])
+
+
+@pytest.mark.parametrize("value", [None, [], {}])
+def test_decode_cursor_rejects_non_scalar_values(value):
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor([value, str(uuid.uuid4())]), [User.email, User.id])
+
+
+@pytest.mark.asyncio
+async def test_get_page_walks_all_rows(db: AsyncSession):
+    full_name = random_lower_string()
+    users = await _create_users(db, full_name, 5)
+    seen, cursor = [], None
+    while True:
+        page, cursor = await crud.user.get_page(
+            db, cursor=cursor, limit=2, full_name=full_name
+        )
+        seen.extend(page)
+        if cursor is None:
+            break
+    assert [u.id for u in seen] == sorted(u.id for u in users)
+
+
+@pytest.mark.asyncio
+async def test_get_page_by_email(db: AsyncSession):
+    full_name = random_lower_string()
+    users = await _create_users(db, full_name, 3)
+    page, cursor = await crud.user.get_page(
+        db, limit=2, order_by="email", full_name=full_name
+    )
+    page_2, cursor_2 = await crud.user.get_page(
+        db, cursor=cursor, limit=2, order_by="email", full_name=full_name
+    )
+    assert [u.email for u in page + page_2] == sorted(u.email for u in users)
+    assert cursor_2 is None
@@ -0,0 +1,65 @@
+import uuid
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import crud
+from src.core.exceptions import DuplicatedEntryError
+from src.schemas import UserCreate, UserUpdate
+from tests.conftest import engine
+from tests.utils import count_queries, random_email, random_lower_string
+
+
+@pytest.mark.asyncio
+async def test_add_user_is_one_statement(db: AsyncSession) -> None:
+    user_in = UserCreate(email=random_email(), password=random_lower_string())
+    with count_queries(engine) as statements:
+        await crud.user.add(db, obj_in=user_in)
+    assert len(statements) == 1
+    assert "INSERT INTO users" in statements[0]
+
+
+@pytest.mark.asyncio
+async def test_add_duplicate_user_is_one_statement(db: AsyncSession) -> None:
+    user_in = UserCreate(email=random_email(), password=random_lower_string())
+    await crud.user.add(db, obj_in=user_in)
+    with count_queries(engine) as statements:
+        with pytest.raises(DuplicatedEntryError):
+            await crud.user.add(db, obj_in=user_in)
+    assert len(statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_update_user_is_one_statement(db: AsyncSession) -> None:
+    user_in = UserCreate(email=random_email(), password=random_lower_string())
+    user = await crud.user.add(db, obj_in=user_in)
+    full_name = random_lower_string()
+    with count_queries(engine) as statements:
+        updated = await crud.user.update(
+            db, id_=user.id, obj_in=UserUpdate(full_name=full_name)
+        )
+    assert len(statements) == 1
+    assert "UPDATE users" in statements[0]
+    assert updated.id == user.id
+    assert updated.full_name == full_name
+
+
+@pytest.mark.asyncio
+async def test_update_missing_user_returns_none(db: AsyncSession) -> None:
+    with count_queries(engine) as statements:
+        updated = await crud.user.update(
+            db, id_=uuid.uuid4(), obj_in=UserUpdate(full_name=random_lower_string())
+        )
+    assert updated is None
+    assert len(statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_update_to_taken_email_raises(db: AsyncSession) -> None:
+    email = random_email()
+    await crud.user.add(db, obj_in=UserCreate(email=email, password="password"))
+    user = await crud.user.add(
+        db, obj_in=UserCreate(email=random_email(), password="password")
+    )
+    with pytest.raises(DuplicatedEntryError):
+        await crud.user.update(db, id_=user.id, obj_in=UserUpdate(email=email))
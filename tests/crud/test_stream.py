@@ -0,0 +1,27 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import crud
+from src.schemas import UserCreate
+from tests.utils import random_email, random_lower_string
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_filtered_batches(db: AsyncSession):
+    full_name = random_lower_string()
+    emails = set()
+    for _ in range(5):
+        user_in = UserCreate(
+            email=random_email(), password=random_lower_string(), full_name=full_name
+        )
+        emails.add((await crud.user.add(db, obj_in=user_in)).email)
+    batches = [
+        batch
+        async for batch in crud.user.stream(
+            db, columns=["id", "email"], batch_size=2, full_name=full_name
+        )
+    ]
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    rows = [row for batch in batches for row in batch]
+    assert {row["email"] for row in rows} == emails
+    assert set(rows[0].keys()) == {"id", "email"}
@@ -0,0 +1,83 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import crud
+from src.core.revocation import RevocationList, version_key
+from src.schemas import UserCreate, UserUpdate
+from tests.utils import random_email, random_lower_string
+
+
+async def _user_id(db: AsyncSession) -> uuid.UUID:
+    user_in = UserCreate(email=random_email(), password=random_lower_string())
+    return (await crud.user.add(db, obj_in=user_in)).id
+
+
+async def test_rotate_refresh_token(db: AsyncSession):
+    user_id = await _user_id(db)
+    token = await crud.refresh_token.issue(db, user_id=user_id)
+    new_token, rotated_user_id, scope = await crud.refresh_token.rotate(db, token=token)
+    assert rotated_user_id == user_id
+    assert scope is None
+    assert new_token != token
+    assert await crud.refresh_token.rotate(db, token=random_lower_string()) is None
+
+
+async def test_reused_refresh_token_revokes_family(db: AsyncSession):
+    user_id = await _user_id(db)
+    token = await crud.refresh_token.issue(db, user_id=user_id)
+    new_token, _, _ = await crud.refresh_token.rotate(db, token=token)
+    assert await crud.refresh_token.rotate(db, token=token) is None
+    assert await crud.refresh_token.rotate(db, token=new_token) is None
+
+
+async def test_rotated_refresh_token_keeps_scope(db: AsyncSession):
+    user_id = await _user_id(db)
+    token = await crud.refresh_token.issue(db, user_id=user_id, scope="me")
+    new_token, _, scope = await crud.refresh_token.rotate(db, token=token)
+    assert scope == "me"
+    assert (await crud.refresh_token.rotate(db, token=new_token))[2] == "me"
+
+
+async def test_revoke_family(db: AsyncSession):
+    user_id = await _user_id(db)
+    token = await crud.refresh_token.issue(db, user_id=user_id)
+    other = await crud.refresh_token.issue(db, user_id=user_id)
+    await crud.refresh_token.revoke_family(db, token=token)
+    assert await crud.refresh_token.rotate(db, token=token) is None
+    assert await crud.refresh_token.rotate(db, token=other) is not None
+
+
+async def test_password_change_revokes_refresh_tokens(db: AsyncSession):
+    user_id = await _user_id(db)
+    token = await crud.refresh_token.issue(db, user_id=user_id)
+    await crud.user.update(
+        db, id_=user_id, obj_in=UserUpdate(password=random_lower_string())
+    )
+    assert await crud.refresh_token.rotate(db, token=token) is None
+    assert await crud.refresh_token.issue(db, user_id=user_id)
+
+
+async def test_sync_revoked_tokens(db: AsyncSession):
+    revocations = RevocationList()
+    await crud.revoked_token.sync(db, revocations)
+    jti = uuid.uuid4().hex
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=5)
+    await crud.revoked_token.revoke(db, jti=jti, expires_at=expires_at)
+    assert jti not in revocations
+    await crud.revoked_token.sync(db, revocations)
+    assert jti in revocations
+    assert revocations.synced_until is not None
+
+
+async def test_revoke_version(db: AsyncSession):
+    user_id = await _user_id(db)
+    jti, expires_at = await crud.revoked_token.revoke_version(db, user_id=user_id)
+    await db.commit()
+    assert jti == version_key(user_id, 0)
+    assert expires_at > datetime.now(timezone.utc)
+    revocations = RevocationList()
+    await crud.revoked_token.sync(db, revocations)
+    assert version_key(user_id, 0) in revocations
+    assert version_key(user_id, 1) not in revocations
@@ -1,10 +1,17 @@
+import json
+
 import pytest
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src import crud
+from src import crud, schemas
+from src.core.config import settings
+from src.core.exceptions import DuplicatedEntryError
+from src.core.hashing import hasher
+from src.core.revocation import revocation_list, version_key
 from src.core.security import verify_password
-from src.schemas import UserCreate, UserUpdate
+from src.core.token_cache import token_cache
+from src.schemas import Principal, User, UserCreate, UserUpdate
 from tests.utils import random_email, random_lower_string
 
 
@@ -31,6 +38,21 @@ async def test_authenticate_user(db: AsyncSession) -> None:
     assert user.email == authenticated_user.email
 
 
+@pytest.mark.asyncio
+async def test_cached_user_rows_leave_out_password_hash(db: AsyncSession) -> None:
+    if crud.user.cache is None:
+        pytest.skip("user cache is disabled")
+    user_in = UserCreate(email=random_email(), password=random_lower_string())
+    user = await crud.user.add(db, obj_in=user_in)
+    db.expunge_all()
+    assert (await crud.user.get_one(db, id_=user.id)).id == user.id
+    raw = await crud.user.cache.backend.get(crud.user.cache.key("id", user.id))
+    assert "hashed_password" not in json.loads(raw)
+    db.expunge_all()
+    cached = await crud.user.get_one(db, id_=user.id)
+    assert json.loads(schemas.dump_user_json(cached))["email"] == user.email
+
+
 @pytest.mark.asyncio
 async def test_not_authenticate_user(db: AsyncSession) -> None:
     email = random_email()
@@ -39,6 +61,38 @@ async def test_not_authenticate_user(db: AsyncSession) -> None:
     assert user is None
 
 
+@pytest.mark.asyncio
+async def test_authenticate_upgrades_password_hash(db: AsyncSession, monkeypatch):
+    email = random_email()
+    password = random_lower_string()
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+    await crud.user.add(db, obj_in=UserCreate(email=email, password=password))
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 5)
+    user = await crud.user.authenticate(db, email=email, password=password)
+    assert user.hashed_password.startswith("$2b$05$")
+    stored = await crud.user.get_by_email(db, email=email)
+    assert stored.hashed_password == user.hashed_password
+    assert verify_password(password, stored.hashed_password)
+
+
+@pytest.mark.asyncio
+async def test_email_is_case_insensitive(db: AsyncSession) -> None:
+    email = f"{random_lower_string().title()}@example.com"
+    password = random_lower_string()
+    user = await crud.user.add(db, obj_in=UserCreate(email=email, password=password))
+    assert user.email == email
+    found = await crud.user.get_by_email(db, email=email.upper())
+    assert found is not None and found.id == user.id
+    authenticated = await crud.user.authenticate(
+        db, email=email.lower(), password=password
+    )
+    assert authenticated is not None and authenticated.id == user.id
+    with pytest.raises(DuplicatedEntryError):
+        await crud.user.add(
+            db, obj_in=UserCreate(email=email.lower(), password=password)
+        )
+
+
 @pytest.mark.asyncio
 async def test_check_if_user_is_superuser(db: AsyncSession) -> None:
     email = random_email()
@@ -84,3 +138,108 @@ async def test_update_user(db: AsyncSession) -> None:
     assert user_2
     assert user.email == user_2.email
     assert verify_password(new_password, user_2.hashed_password)
+
+
+@pytest.mark.asyncio
+async def test_update_user_invalidates_cached_tokens(db: AsyncSession) -> None:
+    email = random_email()
+    user_in = UserCreate(email=email, password=random_lower_string())
+    user = await crud.user.add(db, obj_in=user_in)
+    token = random_lower_string()
+    token_cache.set(token, None, Principal(user.id, False), exp=None)
+    user_in_update = UserUpdate(password=random_lower_string(), full_name=email)
+    await crud.user.update(db, id_=user.id, obj_in=user_in_update)
+    assert token_cache.get(token) is None
+
+
+@pytest.mark.asyncio
+async def test_role_change_revokes_token_version(db: AsyncSession) -> None:
+    user_in = UserCreate(
+        email=random_email(), password=random_lower_string(), is_superuser=True
+    )
+    user = await crud.user.add(db, obj_in=user_in)
+    assert user.token_version == 0
+    user = await crud.user.update(db, id_=user.id, obj_in=UserUpdate(is_superuser=True))
+    assert user.token_version == 0
+    assert version_key(user.id, 0) not in revocation_list
+    user = await crud.user.update(
+        db, id_=user.id, obj_in=UserUpdate(is_superuser=False)
+    )
+    assert user.is_superuser is False
+    assert user.token_version == 1
+    assert version_key(user.id, 0) in revocation_list
+    assert version_key(user.id, 1) not in revocation_list
+
+
+@pytest.mark.asyncio
+async def test_add_many_reports_duplicates(db: AsyncSession) -> None:
+    existing = await crud.user.add(
+        db, obj_in=UserCreate(email=random_email(), password=random_lower_string())
+    )
+    email = random_email()
+    users_in = [
+        UserCreate(email=email, password=random_lower_string()),
+        UserCreate(email=existing.email, password=random_lower_string()),
+        UserCreate(email=email, password=random_lower_string()),
+        UserCreate(email=random_email(), password=random_lower_string()),
+    ]
+    results = await crud.user.add_many(db, objs_in=users_in, batch_size=1)
+    assert [r.status for r in results] == [
+        "created",
+        "duplicate",
+        "duplicate",
+        "created",
+    ]
+    assert [r.index for r in results] == [0, 1, 2, 3]
+    user = await crud.user.authenticate(db, email=email, password=users_in[0].password)
+    assert user.id == results[0].id
+
+
+@pytest.mark.asyncio
+async def test_add_many_treats_email_case_as_duplicate(db: AsyncSession) -> None:
+    existing = await crud.user.add(
+        db, obj_in=UserCreate(email=random_email(), password=random_lower_string())
+    )
+    email = f"{random_lower_string()}@example.com"
+    users_in = [
+        UserCreate(email=existing.email.upper(), password=random_lower_string()),
+        UserCreate(email=email, password=random_lower_string()),
+        UserCreate(email=email.upper(), password=random_lower_string()),
+    ]
+    results = await crud.user.add_many(db, objs_in=users_in)
+    assert [r.status for r in results] == ["duplicate", "created", "duplicate"]
+
+
+@pytest.mark.asyncio
+async def test_add_many_hashes_outside_transactions(
+    db: AsyncSession, monkeypatch
+) -> None:
+    hash_many = hasher.hash_many
+    in_transaction = []
+
+    async def spy(passwords):
+        in_transaction.append(db.in_transaction())
+        return await hash_many(passwords)
+
+    monkeypatch.setattr(hasher, "hash_many", spy)
+    users_in = [
+        UserCreate(email=random_email(), password=random_lower_string())
+        for _ in range(3)
+    ]
+    results = await crud.user.add_many(db, objs_in=users_in, batch_size=2)
+    assert [r.status for r in results] == ["created"] * 3
+    assert in_transaction == [False, False]
+    assert not db.in_transaction()
+
+
+@pytest.mark.asyncio
+async def test_dump_users_json_matches_validated_schema(db: AsyncSession) -> None:
+    user_in = UserCreate(email=random_email(), password=random_lower_string())
+    user = await crud.user.add(db, obj_in=user_in)
+    validated = User.model_validate(user)
+    assert schemas.user_from_orm(user) == validated
+    assert schemas.dump_user_json(user) == validated.model_dump_json().encode()
+    assert (
+        json.loads(schemas.dump_users_json([user, validated]))
+        == [json.loads(validated.model_dump_json())] * 2
+    )
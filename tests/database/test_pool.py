@@ -0,0 +1,32 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.core.config import settings
+from src.database.postgres.pool import InstrumentedQueuePool
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_track_checkouts():
+    engine = create_async_engine(
+        settings.ASYNC_DATABASE_URL,
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.1,
+    )
+    pool = engine.sync_engine.pool
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        stats = pool.stats()
+        assert stats["checked_out"] == 1
+        assert stats["checkouts"] == 1
+        with pytest.raises(TimeoutError):
+            async with engine.connect():
+                pass
+    stats = pool.stats()
+    assert stats["checked_out"] == 0
+    assert stats["timeouts"] == 1
+    assert stats["wait_seconds_max"] >= 0.1
+    await engine.dispose()
@@ -0,0 +1,98 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src import crud
+from src.core.config import settings
+from src.database.postgres import replicas
+from src.database.postgres.database import create_engine
+from src.database.postgres.replicas import ReadSession, ReplicaSet, reader_id
+from src.schemas import UserCreate
+from tests.utils import random_email, random_lower_string
+
+
+def _second_url() -> str:
+    # The test database under another host name stands in for a replica
+    url = make_url(settings.ASYNC_DATABASE_URL)
+    host = "127.0.0.1" if url.host == "localhost" else "localhost"
+    return url.set(host=host).render_as_string(hide_password=False)
+
+
+def _unreachable_url() -> str:
+    url = make_url(settings.ASYNC_DATABASE_URL)
+    return url.set(port=1).render_as_string(hide_password=False)
+
+
+@pytest.mark.asyncio
+async def test_reads_round_robin_over_healthy_replicas():
+    primary = create_engine(settings.ASYNC_DATABASE_URL)
+    first, second = create_engine(_second_url()), create_engine(_second_url())
+    replica_set = ReplicaSet(primary, [first, second])
+    await replica_set.check()
+    assert replica_set.healthy == [first, second]
+    chosen = {replica_set.choose() for _ in range(4)}
+    assert chosen == {first, second}
+    await replica_set.dispose()
+    await primary.dispose()
+
+
+@pytest.mark.asyncio
+async def test_unhealthy_replicas_fall_back_to_primary():
+    primary = create_engine(settings.ASYNC_DATABASE_URL)
+    broken = create_engine(_unreachable_url())
+    replica_set = ReplicaSet(primary, [broken], check_timeout=1)
+    assert replica_set.choose() is broken
+    await replica_set.check()
+    assert replica_set.healthy == []
+    assert replica_set.choose() is primary
+    await replica_set.dispose()
+    await primary.dispose()
+
+
+@pytest.mark.asyncio
+async def test_reads_stick_to_primary_after_a_write():
+    primary = create_engine(settings.ASYNC_DATABASE_URL)
+    replica = create_engine(_second_url())
+    replica_set = ReplicaSet(primary, [replica], sticky_seconds=60)
+    replica_set.stick("writer")
+    assert replica_set.choose("writer") is primary
+    assert replica_set.choose("someone-else") is replica
+    assert replica_set.choose() is replica
+    await replica_set.dispose()
+    await primary.dispose()
+
+
+@pytest.mark.asyncio
+async def test_read_session_binds_to_the_chosen_engine(monkeypatch):
+    primary = create_engine(settings.ASYNC_DATABASE_URL)
+    replica = create_engine(_second_url())
+    replica_set = ReplicaSet(primary, [replica], sticky_seconds=60)
+    monkeypatch.setattr(replicas, "replica_set", replica_set)
+    factory = async_sessionmaker(class_=AsyncSession, sync_session_class=ReadSession)
+
+    async with factory() as session:
+        assert await session.scalar(text("SELECT 1")) == 1
+        assert session.sync_session.get_bind() is replica.sync_engine
+
+    replica_set.stick("writer")
+    token = reader_id.set("writer")
+    try:
+        async with factory() as session:
+            assert await session.scalar(text("SELECT 1")) == 1
+            assert session.sync_session.get_bind() is primary.sync_engine
+    finally:
+        reader_id.reset(token)
+    await replica_set.dispose()
+    await primary.dispose()
+
+
+@pytest.mark.asyncio
+async def test_replica_reads_do_not_fill_the_user_cache(db: AsyncSession):
+    if crud.user.cache is None:
+        pytest.skip("user cache is disabled")
+    user_in = UserCreate(email=random_email(), password=random_lower_string())
+    user = await crud.user.add(db, obj_in=user_in)
+    async with replicas.ReadSessionFactory() as session:
+        assert (await crud.user.get_one(session, id_=user.id)).id == user.id
+    assert await crud.user.cache.backend.get(crud.user.cache.key("id", user.id)) is None
@@ -0,0 +1,149 @@
+import asyncio
+from typing import Dict, List
+
+import pytest
+from aiokafka.errors import CommitFailedError
+from aiokafka.structs import ConsumerRecord, TopicPartition
+
+from src.kafka.consumer import ConsumerEngine, _lag
+
+
+def _record(tp: TopicPartition, offset: int) -> ConsumerRecord:
+    return ConsumerRecord(
+        tp.topic, tp.partition, offset, 0, 0, None, b"{}", 0, 0, 2, ()
+    )
+
+
+class InProcessConsumer:
+    """
+    Stands in for `AIOKafkaConsumer`: every partition holds `size` records,
+    `getmany` returns up to `max_records` of them from the current positions.
+    """
+
+    def __init__(self, partitions: List[TopicPartition], size: int):
+        self.partitions = partitions
+        self.size = size
+        self.positions = {tp: 0 for tp in partitions}
+        self.committed: Dict[TopicPartition, int] = {}
+
+    def assignment(self):
+        return set(self.partitions)
+
+    def highwater(self, tp: TopicPartition) -> int:
+        return self.size
+
+    def seek(self, tp: TopicPartition, offset: int) -> None:
+        self.positions[tp] = offset
+
+    async def getmany(self, timeout_ms: int = 0, max_records: int = None):
+        batches = {}
+        for tp, position in self.positions.items():
+            end = min(self.size, position + max_records)
+            if end > position:
+                batches[tp] = [_record(tp, offset) for offset in range(position, end)]
+                self.positions[tp] = end
+        return batches
+
+    async def commit(self, offsets: Dict[TopicPartition, int]) -> None:
+        self.committed.update(offsets)
+
+    async def stop(self) -> None:
+        pass
+
+
+PARTITIONS = [TopicPartition("topic", 0), TopicPartition("topic", 1)]
+
+
+@pytest.mark.asyncio
+async def test_batches_are_handled_in_order_and_committed():
+    consumer = InProcessConsumer(PARTITIONS, size=5)
+    handled: Dict[int, List[int]] = {0: [], 1: []}
+
+    async def handler(tp, records):
+        handled[tp.partition].extend(record.offset for record in records)
+
+    engine = ConsumerEngine(consumer, handler, max_records=3, retry_backoff=0)
+    assert await engine.process_batch() == 6
+    assert consumer.committed == {PARTITIONS[0]: 3, PARTITIONS[1]: 3}
+    assert _lag[("topic", "0")] == 2
+    assert await engine.process_batch() == 4
+    assert handled == {0: [0, 1, 2, 3, 4], 1: [0, 1, 2, 3, 4]}
+    assert consumer.committed == {PARTITIONS[0]: 5, PARTITIONS[1]: 5}
+    assert _lag[("topic", "1")] == 0
+
+
+@pytest.mark.asyncio
+async def test_partitions_are_handled_concurrently():
+    consumer = InProcessConsumer(PARTITIONS, size=1)
+    started = {tp: asyncio.Event() for tp in PARTITIONS}
+
+    async def handler(tp, records):
+        # Each partition waits for the other one, which deadlocks if they
+        # are handled one after the other
+        started[tp].set()
+        other = PARTITIONS[1 - tp.partition]
+        await started[other].wait()
+
+    engine = ConsumerEngine(consumer, handler, retry_backoff=0)
+    assert await asyncio.wait_for(engine.process_batch(), timeout=1) == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_partition_is_redelivered():
+    consumer = InProcessConsumer(PARTITIONS, size=2)
+    failures = 1
+    handled: List[int] = []
+
+    async def handler(tp, records):
+        nonlocal failures
+        if tp.partition == 0 and failures:
+            failures -= 1
+            raise ValueError("broken")
+        handled.extend(record.offset for record in records if tp.partition == 0)
+
+    engine = ConsumerEngine(consumer, handler, retry_backoff=0)
+    assert await engine.process_batch() == 2
+    assert consumer.committed == {PARTITIONS[1]: 2}
+    assert await engine.process_batch() == 2
+    assert consumer.committed == {PARTITIONS[0]: 2, PARTITIONS[1]: 2}
+    assert handled == [0, 1]
+
+
+@pytest.mark.asyncio
+async def test_failed_commit_keeps_consuming():
+    consumer = InProcessConsumer(PARTITIONS, size=2)
+    commit = consumer.commit
+    failures = 1
+
+    async def flaky_commit(offsets):
+        nonlocal failures
+        if failures:
+            failures -= 1
+            raise CommitFailedError("rebalanced")
+        await commit(offsets)
+
+    async def handler(tp, records):
+        pass
+
+    consumer.commit = flaky_commit
+    engine = ConsumerEngine(consumer, handler, max_records=1, retry_backoff=0)
+    assert await engine.process_batch() == 2
+    assert consumer.committed == {}
+    assert await engine.process_batch() == 2
+    assert consumer.committed == {PARTITIONS[0]: 2, PARTITIONS[1]: 2}
+
+
+@pytest.mark.asyncio
+async def test_revoked_partition_is_not_committed():
+    consumer = InProcessConsumer(PARTITIONS, size=1)
+
+    async def handler(tp, records):
+        # A rebalance revokes partition 1 while the batch is handled
+        consumer.partitions = [PARTITIONS[0]]
+        if tp.partition == 1:
+            raise ValueError("broken")
+
+    engine = ConsumerEngine(consumer, handler, retry_backoff=0)
+    assert await engine.process_batch() == 1
+    assert consumer.committed == {PARTITIONS[0]: 1}
+    assert consumer.positions[PARTITIONS[1]] == 1
@@ -0,0 +1,114 @@
+import asyncio
+from typing import Any, List, Optional, Tuple
+
+import pytest
+from aiokafka.errors import KafkaConnectionError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import crud
+from src.kafka.relay import OutboxRelay
+from src.schemas import UserCreate
+from tests.conftest import async_session_maker
+from tests.utils import random_email, random_lower_string
+
+
+class InProcessBroker:
+    """
+    Stands in for `AIOKafkaProducer`: `send` queues a message and returns a
+    future that resolves when it is acknowledged, or fails while the broker
+    is unavailable.
+    """
+
+    def __init__(self):
+        self.available = True
+        self.messages: List[Tuple[str, Optional[str], Any]] = []
+
+    async def start(self) -> None:
+        if not self.available:
+            raise KafkaConnectionError()
+
+    async def stop(self) -> None:
+        pass
+
+    async def send(self, topic: str, value: Any, key: Optional[str] = None):
+        delivery = asyncio.get_running_loop().create_future()
+        if self.available:
+            self.messages.append((topic, key, value))
+            delivery.set_result(None)
+        else:
+            delivery.set_exception(KafkaConnectionError())
+        return delivery
+
+    def events(self, key: str) -> List[str]:
+        return [value["type"] for _, k, value in self.messages if k == key]
+
+
+def _relay(broker: InProcessBroker) -> OutboxRelay:
+    return OutboxRelay(
+        lambda: broker,
+        session_factory=async_session_maker,
+        poll_interval=0.01,
+        max_backoff=0.01,
+    )
+
+
+async def _drain(relay: OutboxRelay, broker: InProcessBroker) -> None:
+    while await relay.publish_batch(broker):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_relay_publishes_and_removes_events(db: AsyncSession) -> None:
+    broker = InProcessBroker()
+    relay = _relay(broker)
+    user_in = UserCreate(email=random_email(), password=random_lower_string())
+    user = await crud.user.add(db, obj_in=user_in)
+
+    await _drain(relay, broker)
+    assert broker.events(str(user.id)) == ["user.created"]
+    topic, _, message = broker.messages[-1]
+    assert topic == "user-events"
+    assert message["data"]["email"] == user_in.email
+
+    await _drain(relay, broker)
+    assert broker.events(str(user.id)) == ["user.created"]
+
+
+@pytest.mark.asyncio
+async def test_relay_keeps_events_while_broker_is_down(db: AsyncSession) -> None:
+    broker = InProcessBroker()
+    relay = _relay(broker)
+    await _drain(relay, broker)
+
+    broker.available = False
+    user = await crud.user.add(
+        db, obj_in=UserCreate(email=random_email(), password=random_lower_string())
+    )
+    with pytest.raises(KafkaConnectionError):
+        await relay.publish_batch(broker)
+
+    broker.available = True
+    await _drain(relay, broker)
+    assert broker.events(str(user.id)) == ["user.created"]
+
+
+@pytest.mark.asyncio
+async def test_run_retries_until_broker_is_back(db: AsyncSession) -> None:
+    broker = InProcessBroker()
+    broker.available = False
+    task = asyncio.create_task(_relay(broker).run())
+    try:
+        user = await crud.user.add(
+            db, obj_in=UserCreate(email=random_email(), password=random_lower_string())
+        )
+        await asyncio.sleep(0.05)
+        broker.available = True
+        for _ in range(100):
+            if broker.events(str(user.id)):
+                break
+            await asyncio.sleep(0.01)
+        assert broker.events(str(user.id)) == ["user.created"]
+    finally:
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
@@ -0,0 +1,63 @@
+import httpx
+import pytest
+
+from src import crud
+from src.core.config import settings
+from src.database.postgres.database import AsyncSessionFactory, engine
+from src.main import app, lifespan
+from src.schemas import UserCreate, UserUpdate
+from tests.utils import count_queries, random_email, random_lower_string
+
+
+@pytest.mark.asyncio
+async def test_ready_only_while_warm(monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_RELAY_ENABLED", False)
+    monkeypatch.setattr(settings, "KAFKA_CONSUMER_ENABLED", False)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/ready")
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+
+        async with lifespan(app):
+            response = await client.get("/ready")
+            assert response.status_code == 200
+            assert response.json() == {"status": "ready"}
+
+        assert (await client.get("/ready")).status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_demotion_takes_effect_without_user_lookups(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    email, password = random_email(), random_lower_string()
+    async with AsyncSessionFactory() as session:
+        user = await crud.user.add(
+            session,
+            obj_in=UserCreate(email=email, password=password, is_superuser=True),
+        )
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post(
+            f"{settings.API_V1_STR}/login",
+            data={"username": email, "password": password},
+        )
+        assert response.json()["scope"] == "me users"
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        response = await client.post(
+            f"{settings.API_V1_STR}/login",
+            data={"username": email, "password": password, "scope": "me"},
+        )
+        me_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        users_url = f"{settings.API_V1_STR}/users/?limit=1"
+
+        with count_queries(engine) as statements:
+            assert (await client.get(users_url, headers=headers)).status_code == 200
+        assert not any("FROM users" in s and "WHERE users.id" in s for s in statements)
+        assert (await client.get(users_url, headers=me_headers)).status_code == 403
+
+        async with AsyncSessionFactory() as session:
+            await crud.user.update(
+                session, id_=user.id, obj_in=UserUpdate(is_superuser=False)
+            )
+        assert (await client.get(users_url, headers=headers)).status_code == 403
@@ -1,5 +1,10 @@
+import contextlib
 import random
 import string
+from typing import Iterator, List
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
 
 
 def random_lower_string() -> str:
@@ -8,3 +13,20 @@ def random_lower_string() -> str:
 
 def random_email() -> str:
     return f"{random_lower_string()}@{random_lower_string()}.com"
+
+
+@contextlib.contextmanager
+def count_queries(engine: AsyncEngine) -> Iterator[List[str]]:
+    """
+    Collect every SQL statement sent through `engine` inside the block.
+    """
+    statements: List[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)